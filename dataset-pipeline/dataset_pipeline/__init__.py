@@ -0,0 +1 @@
+from dataset_pipeline.config import Config, configure
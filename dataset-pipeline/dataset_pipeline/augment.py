@@ -0,0 +1,333 @@
+import io
+import os
+from functools import lru_cache
+from shutil import rmtree
+from time import perf_counter, time
+import cv2
+import numpy as np
+
+from dataset_pipeline.cache import get_cached_rows
+from dataset_pipeline.config import Files
+from dataset_pipeline.files.manifest import Manifest
+
+# Output formats and their file extensions
+OUTPUT_FORMATS = {
+    'jpg': '.jpg',
+    'webp': '.webp',
+    'png': '.png',
+    'npy': '.npy',
+}
+
+# Augmentation pipelines cached by image shape, created on first use with the configured size
+transform_cache = None
+
+
+def create_transform(height, width):
+    """
+    Create the augmentation pipeline for an image shape.
+
+    Args:
+        height (int): Height of the images.
+        width (int): Width of the images.
+    Returns:
+        A.Compose: The augmentation pipeline.
+    """
+    # Import albumentations here, so only the augmentation stages load it
+    import albumentations as A
+
+    return A.Compose([
+        # Apply with a 50% probability a random brightness and contrast adjustment
+        A.RandomBrightnessContrast(p=0.5),
+
+        # Apply with a 50% probability a horizontal flip
+        A.HorizontalFlip(p=0.5),
+
+        # Apply with a 50% probability a random shift, scale, and rotation
+        A.ShiftScaleRotate(shift_limit=0.2, scale_limit=0.2, rotate_limit=25, p=0.5),
+
+        # Apply with a 30% probability a random RGB shift
+        # A.RGBShift(r_shift_limit=25, g_shift_limit=25, b_shift_limit=25, p=0.3),
+        # Currently, this is being on hold because it may trigger incorrect labels due to the color shift
+        # If enabled, set Files.AUGMENTATION_REQUIRES_RGB since its limits depend on the channel order
+
+        # Apply with a 30% probability a random crop
+        A.RandomCrop(width=int(width * 0.9), height=int(height * 0.9), p=0.3),  # Optional random crop
+    ])
+
+
+def get_transform(height, width):
+    """
+    Get the augmentation pipeline for an image shape.
+
+    The pipeline depends on the image shape because of the random crop, so it is cached by shape and
+    reused by every image with the same dimensions.
+
+    Args:
+        height (int): Height of the images.
+        width (int): Width of the images.
+    Returns:
+        A.Compose: The augmentation pipeline.
+    """
+    global transform_cache
+    if transform_cache is None:
+        transform_cache = lru_cache(maxsize=Files.AUGMENTATION_PIPELINE_CACHE_SIZE)(create_transform)
+    return transform_cache(height, width)
+
+
+def get_encoder_params(output_format):
+    """
+    Get the OpenCV encoder parameters of an output format.
+
+    Args:
+        output_format (str): Output format, one of OUTPUT_FORMATS.
+    Returns:
+        list[int]: The encoder parameters.
+    """
+    if output_format == 'jpg':
+        return [cv2.IMWRITE_JPEG_QUALITY, Files.JPEG_QUALITY, cv2.IMWRITE_JPEG_OPTIMIZE, int(Files.JPEG_OPTIMIZE)]
+    if output_format == 'webp':
+        return [cv2.IMWRITE_WEBP_QUALITY, Files.WEBP_QUALITY]
+    if output_format == 'png':
+        return [cv2.IMWRITE_PNG_COMPRESSION, Files.PNG_COMPRESSION]
+    if output_format == 'npy':
+        return []
+    raise ValueError(f"Invalid output format: {output_format}, expected one of {tuple(OUTPUT_FORMATS)}")
+
+
+def encode_image(image, output_format):
+    """
+    Encode an image in an output format.
+
+    Args:
+        image (np.ndarray): The BGR image to encode.
+        output_format (str): Output format, one of OUTPUT_FORMATS.
+    Returns:
+        bytes: The encoded image.
+    """
+    # Save raw arrays as NumPy files, they are the fastest to load but the largest
+    if output_format == 'npy':
+        buffer = io.BytesIO()
+        np.save(buffer, image)
+        return buffer.getvalue()
+
+    success, encoded = cv2.imencode(OUTPUT_FORMATS[output_format], image, get_encoder_params(output_format))
+    if not success:
+        raise ValueError(f"Failed to encode the image in the {output_format} format")
+    return encoded.tobytes()
+
+
+def get_output_filename(image_filename, index, output_format):
+    """
+    Get the filename of an augmented image.
+
+    The extension of the original image is kept in the filename, so the images with the same name and different
+    formats (e.g. 'img.jpg' and 'img.png') do not overwrite each other's augmentations ('img_jpg_0.jpg' and
+    'img_png_0.jpg').
+
+    Args:
+        image_filename (str): Filename of the original image.
+        index (int): Index of the augmentation.
+        output_format (str): Output format, one of OUTPUT_FORMATS.
+    Returns:
+        str: The filename of the augmented image.
+    """
+    stem, ext = os.path.splitext(image_filename)
+    return f'{stem}_{ext[1:]}_{index}{OUTPUT_FORMATS[output_format]}'
+
+
+def create_encode_stats():
+    """
+    Create the statistics of the encoded images.
+
+    Returns:
+        dict: The number of images, bytes written and encoding time in seconds.
+    """
+    return {'images': 0, 'bytes': 0, 'encode_time': 0.0}
+
+
+def merge_encode_stats(stats, other_stats):
+    """
+    Add the statistics of other encoded images.
+
+    Args:
+        stats (dict): The statistics to update.
+        other_stats (dict): The statistics to add.
+    """
+    for key, value in other_stats.items():
+        stats[key] += value
+
+
+def print_encode_report(stats, output_format):
+    """
+    Print the bytes written and the encoding time of the augmented images.
+
+    Args:
+        stats (dict): The statistics of the encoded images.
+        output_format (str): Output format of the images.
+    """
+    images = max(stats['images'], 1)
+    print(f"Wrote {stats['images']} images in the {output_format} format: {stats['bytes'] / 1024 ** 2:.2f} MB "
+          f"({stats['bytes'] / images / 1024:.2f} KB/image), encoded in {stats['encode_time']:.2f} seconds "
+          f"({stats['encode_time'] / images * 1000:.3f} ms/image)")
+
+
+def augment(image, output_dir, image_filename, num_augmentations, output_format=None,
+            stats=None):
+    """
+    Augment an image in memory and save the augmented images.
+
+    The image is kept in OpenCV's BGR channel order, unless the pipeline requires RGB.
+
+    Args:
+        image (np.ndarray): The BGR image to augment.
+        output_dir (str): Directory where the augmented images are saved.
+        image_filename (str): Filename of the image, used to name the augmented images.
+        num_augmentations (int): Number of augmented images to generate.
+        output_format (str, optional): Output format of the augmented images, one of OUTPUT_FORMATS.
+        stats (dict, optional): Statistics of the encoded images, updated with the augmented images.
+    Returns:
+        list[str]: The paths of the augmented images.
+    """
+    output_format = Files.AUGMENTATION_FORMAT if output_format is None else output_format
+
+    # Get the pipeline for the image shape
+    transform = get_transform(image.shape[0], image.shape[1])
+
+    # Convert the image to RGB only if the pipeline has transforms that depend on the channel order
+    if Files.AUGMENTATION_REQUIRES_RGB:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+    # Apply the pipeline to the image and annotations
+    output_paths = []
+    for i in range(num_augmentations):
+        # Apply the transformation
+        transformed = transform(image=image)
+        transformed_image = transformed['image']
+
+        # Convert the image back to BGR if needed and encode it
+        if Files.AUGMENTATION_REQUIRES_RGB:
+            transformed_image = cv2.cvtColor(transformed_image, cv2.COLOR_RGB2BGR)
+        encode_start_time = perf_counter()
+        encoded = encode_image(transformed_image, output_format)
+        encode_time = perf_counter() - encode_start_time
+
+        # Save the image
+        output_path = os.path.join(output_dir, get_output_filename(image_filename, i, output_format))
+        with open(output_path, 'wb') as f:
+            f.write(encoded)
+        output_paths.append(output_path)
+
+        if stats is not None:
+            merge_encode_stats(stats, {'images': 1, 'bytes': len(encoded), 'encode_time': encode_time})
+
+    return output_paths
+
+
+def augment_image(input_path, output_dir, image_filename, num_augmentations, output_format=None,
+                  stats=None, image=None):
+    """
+    Augment images.
+
+    The image is read from input_path, unless it is given, e.g. from the dataset cache.
+    """
+    output_format = Files.AUGMENTATION_FORMAT if output_format is None else output_format
+
+    # Get current time
+    start_time = time()
+
+    # Read the image
+    if image is None:
+        image = cv2.imread(input_path)
+    if image is None:
+        print(f"Warning: Could not read {input_path}, run validate.py to quarantine it")
+        return []
+
+    # Augment the image
+    output_paths = augment(image, output_dir, image_filename, num_augmentations, output_format, stats)
+
+    # Log the image
+    end_time = time()
+    elapsed_time = end_time - start_time
+    print(f"Augmented images saved to {output_dir} in {elapsed_time:.2f} seconds")
+
+    return output_paths
+
+
+def augment_dataset(num_augmentations=None, incremental=True, output_format=None):
+    """
+    Augment a dataset.
+
+    The resized dataset is augmented if Files.IMAGE_SIZE is set, otherwise the original dataset. The images in the
+    dataset cache (see cache.py) are read from it instead of decoding them.
+
+    Args:
+        num_augmentations (int, optional): Number of augmented images generated per image.
+        incremental (bool): Skip the images that were already augmented with the same parameters.
+        output_format (str, optional): Output format of the augmented images, one of OUTPUT_FORMATS.
+    """
+    num_augmentations = Files.NUM_AUGMENTATIONS if num_augmentations is None else num_augmentations
+    output_format = Files.AUGMENTATION_FORMAT if output_format is None else output_format
+
+    input_base_dir = Files.DATASET_ORIGINAL if Files.IMAGE_SIZE is None else Files.DATASET_RESIZED
+
+    # Check if the dataset directories exist, if not it creates them
+    for io_dir in [input_base_dir, Files.DATASET_AUGMENTED]:
+        os.makedirs(io_dir, exist_ok=True)
+
+    # Load the manifest of the previous runs
+    parameters = {'num_augmentations': num_augmentations, 'output_format': output_format,
+                  'encoder_params': get_encoder_params(output_format),
+                  'requires_rgb': Files.AUGMENTATION_REQUIRES_RGB}
+    if Files.IMAGE_SIZE is not None:
+        parameters['image_size'] = Files.IMAGE_SIZE
+    manifest = Manifest(Files.DATASET_AUGMENTED_MANIFEST, parameters)
+
+    # Get the images that can be read from the cache
+    cached_images, cached_rows = get_cached_rows(input_base_dir)
+
+    sources = []
+    stats = create_encode_stats()
+    for _, model_class in enumerate(Files.MODEL_CLASSES):
+        # Get the input and output directories
+        input_dir = os.path.join(input_base_dir, model_class)
+        output_dir = os.path.join(Files.DATASET_AUGMENTED, model_class)
+
+        # Ensure the input and output directories exist
+        for io_dir in [input_dir, output_dir]:
+            os.makedirs(io_dir, exist_ok=True)
+
+        # Get the image files, and the files that were already augmented
+        image_filenames = [entry.name for entry in Files.scan_images(input_dir)]
+        existing_paths = {entry.path for entry in Files.scan_dir(output_dir)}
+
+        # Augment each image
+        for image_filename in image_filenames:
+            # Get the image paths
+            input_image_path = os.path.join(input_dir, image_filename)
+            sources.append(input_image_path)
+
+            # Skip the image if it was already augmented
+            if incremental and manifest.is_processed(input_image_path, existing_paths):
+                continue
+
+            # Copy the cached image, so the pipeline does not write into the read-only cache
+            image = None
+            row = cached_rows.get(os.path.normpath(input_image_path))
+            if row is not None:
+                image = np.array(cached_images[row])
+
+            print(f"Augmenting {image_filename}")
+            output_paths = augment_image(input_image_path, output_dir, image_filename, num_augmentations,
+                                         output_format, stats, image)
+            if output_paths:
+                manifest.add([Manifest.create_entry(input_image_path, output_paths)])
+
+    # Remove the entries and outputs of the images that no longer exist
+    manifest.save(sources)
+
+    # Log the bytes written and the encoding time
+    print_encode_report(stats, output_format)
+
+    # Remove the resized dataset directory, unless it is kept for the next incremental run
+    if not incremental and input_base_dir == Files.DATASET_RESIZED:
+        rmtree(Files.DATASET_RESIZED)
@@ -0,0 +1,254 @@
+import json
+import os
+from time import time
+import numpy as np
+
+from dataset_pipeline.config import Files
+from dataset_pipeline.parallel import get_workers, process_batches
+from dataset_pipeline.resize import CENTER_CROP, SHORTEST_SIDE, read_image, resize
+
+# Filenames of the cache
+CACHE_IMAGES_FILENAME = 'images.npy'
+CACHE_LABELS_FILENAME = 'labels.npy'
+CACHE_INDEX_FILENAME = 'index.json'
+
+# Number of rows copied at once when rows are removed from the cache
+CACHE_COPY_CHUNK_SIZE = 256
+
+
+def get_cache_resize_mode():
+    """
+    Get the resize mode of the images that do not have the cache shape.
+
+    Returns:
+        str: Files.RESIZE_MODE, or the center crop mode if it does not resize to a square.
+    """
+    return CENTER_CROP if Files.RESIZE_MODE == SHORTEST_SIDE else Files.RESIZE_MODE
+
+
+def cache_images(tasks):
+    """
+    Decode a batch of images into the cache, this runs inside a worker process.
+
+    Each worker opens the memory-mapped cache and writes its images directly into their rows, so the pixels
+    are never sent between processes.
+
+    Args:
+        tasks (list[tuple[str, int, str]]): List of (cache path, row, image path) tuples.
+    Returns:
+        tuple[int, list[int], list[int]]: The number of processed images, the rows of the images that could not
+            be decoded and the rows of the images that were resized to the cache shape.
+    """
+    images = None
+    failed_rows = []
+    resized_rows = []
+    for cache_path, row, input_path in tasks:
+        if images is None:
+            images = np.load(cache_path, mmap_mode='r+')
+
+        # Skip the images that cannot be decoded, their rows are removed from the cache
+        image = read_image(input_path)
+        if image is None:
+            print(f"Warning: Could not read {input_path}, run validate.py to quarantine it")
+            failed_rows.append(row)
+            continue
+
+        # Resize the image if it does not have the cache shape
+        if image.shape != images.shape[1:]:
+            image = resize(image, get_cache_resize_mode(), images.shape[1])
+            resized_rows.append(row)
+        images[row] = image
+
+    if images is not None:
+        images.flush()
+    return len(tasks), failed_rows, resized_rows
+
+
+def remove_rows(cache_path, keep):
+    """
+    Remove rows from the cache.
+
+    The kept rows are copied in chunks into a new file, so the cache is never loaded into memory.
+
+    Args:
+        cache_path (str): Path of the cached images.
+        keep (np.ndarray): Boolean mask of the rows to keep.
+    """
+    images = np.load(cache_path, mmap_mode='r')
+    kept_rows = np.flatnonzero(keep)
+
+    temp_path = cache_path + '.tmp'
+    kept_images = np.lib.format.open_memmap(temp_path, mode='w+', dtype=np.uint8,
+                                            shape=(len(kept_rows), *images.shape[1:]))
+    for start in range(0, len(kept_rows), CACHE_COPY_CHUNK_SIZE):
+        kept_images[start:start + CACHE_COPY_CHUNK_SIZE] = images[kept_rows[start:start + CACHE_COPY_CHUNK_SIZE]]
+    kept_images.flush()
+
+    # Close the memory maps before replacing the file
+    del images, kept_images
+    os.replace(temp_path, cache_path)
+
+
+def build_cache(input_dir=None, output_dir=None, workers=None,
+                batch_size=None):
+    """
+    Pack a dataset of square images into a single memory-mapped uint8 array, with its labels and filenames.
+
+    The images are sorted by class, so the images of each class are a contiguous range of the array. The images
+    that cannot be decoded are skipped, and the images that do not have the cache shape (e.g. resized with the
+    shortest side mode) are resized to it.
+
+    Args:
+        input_dir (str, optional): Directory of the dataset, with one subdirectory per class.
+        output_dir (str, optional): Directory where the cache is written.
+        workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+        batch_size (int, optional): Number of images per worker batch.
+    """
+    input_dir = Files.DATASET_RESIZED if input_dir is None else input_dir
+    output_dir = Files.DATASET_CACHE if output_dir is None else output_dir
+    workers = Files.NUM_WORKERS if workers is None else workers
+    batch_size = Files.BATCH_SIZE if batch_size is None else batch_size
+
+    # Get current time
+    start_time = time()
+
+    # Check if the output directory exists, if not create it
+    Files.ensure_directory_exists(output_dir)
+
+    # Get the images of each class, with their size and modification time
+    filenames = []
+    labels = []
+    sources = []
+    for label, model_class in enumerate(Files.MODEL_CLASSES):
+        class_dir = os.path.join(input_dir, model_class)
+        entries = []
+        if os.path.exists(class_dir):
+            entries = sorted(Files.scan_images(class_dir), key=lambda e: e.name)
+
+        filenames += [os.path.join(model_class, entry.name) for entry in entries]
+        labels += [label] * len(entries)
+        sources += [[stat.st_size, stat.st_mtime_ns] for stat in (entry.stat() for entry in entries)]
+
+    # Allocate the cache, it is written by the worker processes
+    cache_path = os.path.join(output_dir, CACHE_IMAGES_FILENAME)
+    images = np.lib.format.open_memmap(cache_path, mode='w+', dtype=np.uint8,
+                                       shape=(len(filenames), Files.IMAGE_SIZE, Files.IMAGE_SIZE, 3))
+    del images
+
+    # Decode the images into the cache across the worker processes
+    tasks = [(cache_path, row, os.path.join(input_dir, filename)) for row, filename in enumerate(filenames)]
+    workers = get_workers(workers)
+    processed = 0
+    failed_rows = []
+    for count, batch_failed_rows, batch_resized_rows in process_batches(cache_images, tasks, workers, batch_size):
+        processed += count
+        failed_rows += batch_failed_rows
+        print(f"Cached {processed}/{len(tasks)} images")
+
+        # The resized rows differ from their image file, so they are not used in its place
+        for row in batch_resized_rows:
+            sources[row] = None
+
+    # Remove the rows of the images that could not be decoded
+    keep = np.ones(len(filenames), dtype=bool)
+    keep[failed_rows] = False
+    if failed_rows:
+        remove_rows(cache_path, keep)
+    filenames = [f for f, k in zip(filenames, keep) if k]
+    sources = [s for s, k in zip(sources, keep) if k]
+    labels = np.array(labels, dtype=np.uint8)[keep]
+
+    # Get the range of rows of each class, the images are sorted by class
+    class_labels = np.arange(len(Files.MODEL_CLASSES))
+    starts = np.searchsorted(labels, class_labels, side='left')
+    ends = np.searchsorted(labels, class_labels, side='right')
+    classes = {model_class: [int(start), int(end)]
+               for model_class, start, end in zip(Files.MODEL_CLASSES, starts, ends)}
+
+    # Save the labels and the index, the input directory is stored relative to the cache
+    np.save(os.path.join(output_dir, CACHE_LABELS_FILENAME), labels)
+    with open(os.path.join(output_dir, CACHE_INDEX_FILENAME), 'w') as f:
+        json.dump({'image_size': Files.IMAGE_SIZE, 'input_dir': os.path.relpath(input_dir, output_dir),
+                   'classes': classes, 'filenames': filenames, 'sources': sources}, f)
+
+    # Log the throughput
+    cached = len(filenames)
+    elapsed_time = time() - start_time
+    throughput = cached / elapsed_time if elapsed_time > 0 else 0
+    print(f"Cached {cached} images into {cache_path} with {workers} workers in {elapsed_time:.2f} seconds "
+          f"({throughput:.2f} images/s), {len(failed_rows)} images could not be decoded")
+
+
+def load_cache(input_dir=None):
+    """
+    Load the cache without reading the images into memory.
+
+    Args:
+        input_dir (str, optional): Directory of the cache.
+    Returns:
+        tuple[np.ndarray, np.ndarray, dict]: The read-only memory-mapped (N, H, W, 3) images, the (N,) labels
+            and the index, with the filenames and the range of rows of each class.
+    """
+    input_dir = Files.DATASET_CACHE if input_dir is None else input_dir
+
+    images = np.load(os.path.join(input_dir, CACHE_IMAGES_FILENAME), mmap_mode='r')
+    labels = np.load(os.path.join(input_dir, CACHE_LABELS_FILENAME))
+    with open(os.path.join(input_dir, CACHE_INDEX_FILENAME), 'r') as f:
+        index = json.load(f)
+    return images, labels, index
+
+
+def get_class_images(images, index, model_class):
+    """
+    Get the images of a class, as a view of the cache.
+
+    Args:
+        images (np.ndarray): The cached images.
+        index (dict): The index of the cache.
+        model_class (str): The class.
+    Returns:
+        tuple[np.ndarray, list[str]]: The images of the class and their filenames.
+    """
+    start, end = index['classes'][model_class]
+    return images[start:end], index['filenames'][start:end]
+
+
+def get_cached_rows(input_dir, cache_dir=None):
+    """
+    Get the cache rows of the images of a dataset that can be used instead of decoding their files.
+
+    Only the images that were cached without resizing them and were not modified since the cache was built are
+    returned, so the cached pixels are the same as the decoded ones.
+
+    Args:
+        input_dir (str): Directory of the dataset.
+        cache_dir (str, optional): Directory of the cache.
+    Returns:
+        tuple[np.ndarray | None, dict[str, int]]: The read-only memory-mapped images, None if there is no cache of
+            the dataset, and the row of each cached image by normalized path.
+    """
+    cache_dir = Files.DATASET_CACHE if cache_dir is None else cache_dir
+
+    if not os.path.exists(os.path.join(cache_dir, CACHE_INDEX_FILENAME)):
+        return None, {}
+
+    # Check that the cache was built from the dataset
+    images, _, index = load_cache(cache_dir)
+    if 'input_dir' not in index or \
+            os.path.normpath(os.path.join(cache_dir, index['input_dir'])) != os.path.normpath(input_dir):
+        return None, {}
+
+    rows = {}
+    for row, (filename, source) in enumerate(zip(index['filenames'], index['sources'])):
+        if source is None:
+            continue
+
+        # Skip the images that were modified or removed
+        image_path = os.path.normpath(os.path.join(input_dir, filename))
+        try:
+            stat = os.stat(image_path)
+        except OSError:
+            continue
+        if [stat.st_size, stat.st_mtime_ns] == source:
+            rows[image_path] = row
+    return images, rows
@@ -0,0 +1,173 @@
+import os
+
+from dataset_pipeline.files import Files as F
+
+
+class Config(F):
+    """
+    Default configuration of the dataset pipeline.
+
+    Each project subclasses it with its classes, paths and settings, and passes the subclass to configure. The
+    dataset paths of a subclass are derived from its DATASET, so a project only sets the paths that differ.
+    """
+    # Image size (None keeps the original size, and the pipeline augments the original images)
+    IMAGE_SIZE = None
+
+    # Resize mode (stretch, letterbox, center_crop or shortest_side) and letterbox padding value
+    RESIZE_MODE = 'stretch'
+    LETTERBOX_PAD_VALUE = 114
+
+    # Minimum ratio between the reduced JPEG decoding size and the image size (None decodes at full size)
+    REDUCED_DECODE_MIN_RATIO = 1.0
+
+    # Dataset path, the other dataset paths are derived from it
+    DATASET = os.path.join(F.CWD, 'dataset')
+
+    # Dataset paths derived from DATASET or from another dataset path, unless a subclass sets them
+    DATASET_PATHS = {
+        'DATASET_ORIGINAL': ('DATASET', 'original'),
+        'DATASET_RESIZED': ('DATASET', 'resized'),
+        'DATASET_AUGMENTED': ('DATASET', 'augmented'),
+        'DATASET_ORGANIZED': ('DATASET', 'organized'),
+        'DATASET_ORGANIZED_TRAINING': ('DATASET_ORGANIZED', 'train'),
+        'DATASET_ORGANIZED_VALIDATIONS': ('DATASET_ORGANIZED', 'val'),
+        'DATASET_ORGANIZED_TESTING': ('DATASET_ORGANIZED', 'test'),
+        'DATASET_ORGANIZED_ZIP': ('DATASET', 'organized.zip'),
+        'DATASET_SPLIT_MANIFEST': ('DATASET', 'split.csv'),
+        'DATASET_SHARDS': ('DATASET', 'shards'),
+        'DATASET_CACHE': ('DATASET', 'cache'),
+        'DATASET_RESIZED_MANIFEST': ('DATASET', 'resized.manifest.jsonl'),
+        'DATASET_AUGMENTED_MANIFEST': ('DATASET', 'augmented.manifest.jsonl'),
+        'DATASET_RESIZED_AUGMENTED_MANIFEST': ('DATASET', 'resized_augmented.manifest.jsonl'),
+        'DATASET_DUPLICATES': ('DATASET', 'duplicates'),
+        'DATASET_DUPLICATES_REPORT': ('DATASET', 'duplicates.csv'),
+        'DATASET_DEDUP_MANIFEST': ('DATASET', 'dedup.csv'),
+        'DATASET_QUARANTINE': ('DATASET', 'quarantine'),
+        'DATASET_QUARANTINE_REPORT': ('DATASET', 'quarantine.csv'),
+        'DATASET_VALIDATED_MANIFEST': ('DATASET', 'validated.manifest.jsonl'),
+        'DATASET_PIPELINE_STATE': ('DATASET', 'pipeline.json'),
+    }
+
+    # Names of the dataset paths set explicitly by a class, they are not derived again by its subclasses
+    EXPLICIT_DATASET_PATHS = frozenset()
+
+    # Model classes
+    MODEL_CLASSES = ()
+
+    # Augmentations
+    NUM_AUGMENTATIONS = 10
+
+    # Whether the images are augmented on the fly while training, instead of saving NUM_AUGMENTATIONS copies of each
+    # one, and seed of the on-the-fly augmentations
+    ONLINE_AUGMENTATION = False
+    AUGMENTATION_SEED = 0
+
+    # Number of augmentation pipelines cached by image shape
+    AUGMENTATION_PIPELINE_CACHE_SIZE = 16
+
+    # Whether the augmentation pipeline must run in RGB, otherwise images are kept in OpenCV's BGR order
+    AUGMENTATION_REQUIRES_RGB = False
+
+    # Output format of the augmented images (jpg, webp, png or npy) and encoder settings
+    AUGMENTATION_FORMAT = 'jpg'
+    JPEG_QUALITY = 95
+    JPEG_OPTIMIZE = False
+    WEBP_QUALITY = 90
+    PNG_COMPRESSION = 3
+
+    # Number of worker processes (None uses the number of CPUs) and images per worker batch
+    NUM_WORKERS = None
+    BATCH_SIZE = None
+
+    # Maximum size in bytes of each dataset shard
+    SHARD_MAX_SIZE = 256 * 1024 ** 2
+
+    # How the split stage transfers the images (move, hardlink, reflink, copy, manifest or zip) and its seed
+    SPLIT_MODE = 'move'
+    SPLIT_SEED = 0
+
+    # Whether the split stage splits the source images of each class with the exact ratios, adding images may then
+    # move older images to another split
+    SPLIT_STRATIFY = False
+
+    # Whether the validation stage also decodes the images, instead of only checking their headers and structure
+    VALIDATION_FULL_DECODE = False
+
+    # Perceptual hash used to find near-duplicate images (dhash or phash), and maximum Hamming distance between
+    # the 64-bit hashes of two duplicates
+    DEDUP_HASH = 'dhash'
+    DEDUP_MAX_DISTANCE = 4
+
+    # Number of threads for file transfers (None uses the number of CPUs plus four, up to 32)
+    IO_WORKERS = None
+
+    # Whether the pipeline keeps the intermediate datasets, so the unchanged stages are skipped on the next run
+    PIPELINE_KEEP_INTERMEDIATES = False
+
+    # Maximum size in bytes of each part of the training zip (None writes a single zip, e.g. 2 * 1024 ** 3)
+    ZIP_PART_MAX_SIZE = None
+
+
+    def __init_subclass__(cls, **kwargs):
+        """
+        Derive the dataset paths of a subclass from its DATASET, except the ones it sets.
+        """
+        super().__init_subclass__(**kwargs)
+        cls.set_dataset_paths()
+
+    @classmethod
+    def set_dataset_paths(cls) -> None:
+        """
+        Derive the dataset paths, and the manifests of the augmented dataset, that the class does not set.
+        """
+        explicit_paths = cls.EXPLICIT_DATASET_PATHS | {name for name in (*cls.DATASET_PATHS, 'AUGMENTED_MANIFESTS')
+                                                       if name in cls.__dict__}
+        cls.EXPLICIT_DATASET_PATHS = frozenset(explicit_paths)
+
+        # The paths are in order, so a path is derived after the path it depends on
+        for name, (parent, relative_path) in cls.DATASET_PATHS.items():
+            if name not in explicit_paths:
+                setattr(cls, name, os.path.join(getattr(cls, parent), relative_path))
+        if 'AUGMENTED_MANIFESTS' not in explicit_paths:
+            cls.AUGMENTED_MANIFESTS = (cls.DATASET_AUGMENTED_MANIFEST, cls.DATASET_RESIZED_AUGMENTED_MANIFEST)
+
+
+# Derive the default dataset paths
+Config.set_dataset_paths()
+
+class ConfigProxy:
+    """
+    Proxy to the configuration of the project.
+
+    The stages read the configuration through the proxy when they run, instead of when they are imported, so the
+    project can configure the pipeline after importing them.
+    """
+
+    def __init__(self, config: type[Config] = Config):
+        """
+        Initialize the proxy.
+
+        Args:
+            config (type[Config]): The configuration class.
+        """
+        self.config = config
+
+    def __getattr__(self, name: str) -> object:
+        return getattr(self.config, name)
+
+
+# Configuration used by the stages
+Files = ConfigProxy()
+
+
+def configure(config: type[Config]) -> None:
+    """
+    Set the configuration used by the stages.
+
+    Call it at the module level of the project scripts, so the worker processes started with the spawn method
+    also run it when they import the main module.
+
+    Args:
+        config (type[Config]): The configuration class of the project.
+    """
+    Files.config = config
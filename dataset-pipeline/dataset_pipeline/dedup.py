@@ -0,0 +1,228 @@
+import csv
+import os
+from time import time
+import cv2
+import numpy as np
+
+from dataset_pipeline.config import Files
+from dataset_pipeline.parallel import get_workers, process_batches, process_threads
+from dataset_pipeline.utils.hamming import HammingIndex
+
+# Perceptual hashes
+DHASH = 'dhash'
+PHASH = 'phash'
+HASHES = (DHASH, PHASH)
+
+# Size (width, height) the images are reduced to before hashing
+HASH_INPUT_SIZES = {DHASH: (9, 8), PHASH: (32, 32)}
+
+# Number of low frequencies of each axis kept by pHash
+PHASH_FREQUENCIES = 8
+
+
+def get_dct_matrix(size):
+    """
+    Get the orthonormal DCT-II matrix, the DCT of the rows of a matrix X is X @ D.T.
+
+    Args:
+        size (int): Number of samples.
+    Returns:
+        np.ndarray: The (size, size) DCT matrix.
+    """
+    k = np.arange(size)[:, None]
+    n = np.arange(size)[None, :]
+    matrix = np.sqrt(2 / size) * np.cos(np.pi * (2 * n + 1) * k / (2 * size))
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+def compute_hashes(images, hash_method=None):
+    """
+    Compute the 64-bit perceptual hashes of a batch of images at once.
+
+    dHash compares each pixel with its right neighbor in a 9x8 image. pHash compares the 8x8 lowest
+    frequencies of the DCT of a 32x32 image with their median.
+
+    Args:
+        images (np.ndarray): Grayscale images reduced to HASH_INPUT_SIZES, as a (N, H, W) array.
+        hash_method (str, optional): Perceptual hash, one of HASHES.
+    Returns:
+        np.ndarray: The hashes as a (N,) uint64 array.
+    """
+    hash_method = Files.DEDUP_HASH if hash_method is None else hash_method
+
+    images = images.astype(np.float32)
+    if hash_method == DHASH:
+        bits = images[:, :, 1:] > images[:, :, :-1]
+    elif hash_method == PHASH:
+        dct = get_dct_matrix(images.shape[1]).astype(np.float32)
+        frequencies = (dct @ images @ dct.T)[:, :PHASH_FREQUENCIES, :PHASH_FREQUENCIES].reshape(len(images), -1)
+
+        # Skip the DC coefficient, it only depends on the mean brightness
+        bits = frequencies > np.median(frequencies[:, 1:], axis=1, keepdims=True)
+    else:
+        raise ValueError(f"Invalid hash: {hash_method}, expected one of {HASHES}")
+
+    return np.packbits(bits.reshape(len(images), -1), axis=1).view('>u8').ravel()
+
+
+def hash_images(tasks):
+    """
+    Hash a batch of images, this runs inside a worker process.
+
+    Args:
+        tasks (list[tuple[str, str]]): List of (image path, hash method) tuples.
+    Returns:
+        tuple[list[str], list[int]]: The paths of the decoded images and their hashes, the images that
+            cannot be decoded are skipped.
+    """
+    paths = []
+    images = []
+    for input_path, hash_method in tasks:
+        # Decode the image at a reduced scale, the hash only needs a few pixels
+        image = cv2.imread(input_path, cv2.IMREAD_REDUCED_GRAYSCALE_4)
+        if image is None:
+            print(f"Warning: Could not read {input_path}")
+            continue
+
+        paths.append(input_path)
+        images.append(cv2.resize(image, HASH_INPUT_SIZES[hash_method], interpolation=cv2.INTER_AREA))
+
+    if not images:
+        return [], []
+    return paths, compute_hashes(np.stack(images), tasks[0][1]).tolist()
+
+
+def find_duplicates(paths, hashes, max_distance=None):
+    """
+    Find the near-duplicate images, the first image of each group of duplicates is kept.
+
+    Args:
+        paths (list[str]): Paths of the images, in the order they are kept.
+        hashes (list[int]): Perceptual hashes of the images.
+        max_distance (int, optional): Maximum Hamming distance between the hashes of two duplicates.
+    Returns:
+        list[tuple[str, str, int]]: List of (duplicate path, kept path, distance) tuples.
+    """
+    max_distance = Files.DEDUP_MAX_DISTANCE if max_distance is None else max_distance
+
+    index = HammingIndex(max_distance)
+    duplicates = []
+    for path, image_hash in zip(paths, hashes):
+        # Compare the image with the closest kept image
+        match = min(index.search(image_hash), default=None, key=lambda m: m[0])
+        if match is None:
+            index.add(image_hash, path)
+        else:
+            duplicates.append((path, match[1], match[0]))
+    return duplicates
+
+
+def write_duplicates_report(duplicates, report_path=None):
+    """
+    Write the duplicates report.
+
+    Args:
+        duplicates (list[tuple[str, str, int]]): List of (duplicate path, kept path, distance) tuples, the paths
+            are stored relative to the report directory.
+        report_path (str, optional): Path of the report.
+    """
+    report_path = Files.DATASET_DUPLICATES_REPORT if report_path is None else report_path
+
+    report_dir = os.path.dirname(report_path)
+    Files.ensure_directory_exists(report_dir)
+
+    with open(report_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(('path', 'duplicate_of', 'distance'))
+        for duplicate_path, kept_path, distance in duplicates:
+            writer.writerow((os.path.relpath(duplicate_path, report_dir).replace(os.sep, '/'),
+                             os.path.relpath(kept_path, report_dir).replace(os.sep, '/'), distance))
+
+
+def write_dedup_manifest(rows, manifest_path=None):
+    """
+    Write the manifest of the images kept after removing the duplicates.
+
+    Args:
+        rows (list[tuple[str, str]]): List of (image path, class) tuples, the paths are stored relative to the
+            manifest directory.
+        manifest_path (str, optional): Path of the manifest.
+    """
+    manifest_path = Files.DATASET_DEDUP_MANIFEST if manifest_path is None else manifest_path
+
+    manifest_dir = os.path.dirname(manifest_path)
+    Files.ensure_directory_exists(manifest_dir)
+
+    with open(manifest_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(('path', 'class'))
+        for image_path, model_class in rows:
+            writer.writerow((os.path.relpath(image_path, manifest_dir).replace(os.sep, '/'), model_class))
+
+
+def dedup_dataset(hash_method=None, max_distance=None, write_manifest=False,
+                  move_duplicates=False, workers=None, batch_size=None):
+    """
+    Find the near-duplicate images of the original dataset, before resizing and augmenting them.
+
+    The images are compared across all the classes, so a duplicate saved under two classes is also found. The
+    duplicates are written to the report, with the image they duplicate.
+
+    Args:
+        hash_method (str, optional): Perceptual hash, one of HASHES.
+        max_distance (int, optional): Maximum Hamming distance between the hashes of two duplicates.
+        write_manifest (bool): Write the manifest of the kept images.
+        move_duplicates (bool): Move the duplicates from the original dataset to Files.DATASET_DUPLICATES, so the
+            next stages skip them.
+        workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+        batch_size (int, optional): Number of images per worker batch.
+    """
+    hash_method = Files.DEDUP_HASH if hash_method is None else hash_method
+    max_distance = Files.DEDUP_MAX_DISTANCE if max_distance is None else max_distance
+    workers = Files.NUM_WORKERS if workers is None else workers
+    batch_size = Files.BATCH_SIZE if batch_size is None else batch_size
+
+    # Get current time
+    start_time = time()
+
+    # Get the images of every class, sorted so the same image of each group is always kept
+    tasks = []
+    for _, model_class in enumerate(Files.MODEL_CLASSES):
+        input_dir = os.path.join(Files.DATASET_ORIGINAL, model_class)
+        os.makedirs(input_dir, exist_ok=True)
+        tasks += [(entry.path, hash_method) for entry in sorted(Files.scan_images(input_dir), key=lambda e: e.name)]
+
+    # Hash the images across the worker processes
+    workers = get_workers(workers)
+    paths = []
+    hashes = []
+    for batch_paths, batch_hashes in process_batches(hash_images, tasks, workers, batch_size):
+        paths += batch_paths
+        hashes += batch_hashes
+        print(f"Hashed {len(paths)}/{len(tasks)} images")
+
+    # Find the duplicates and record them
+    duplicates = find_duplicates(paths, hashes, max_distance)
+    write_duplicates_report(duplicates)
+    print(f"Found {len(duplicates)} duplicates in {len(paths)} images, the report was saved to "
+          f"{Files.DATASET_DUPLICATES_REPORT}")
+
+    duplicate_paths = {duplicate_path for duplicate_path, _, _ in duplicates}
+    if write_manifest:
+        write_dedup_manifest([(p, os.path.basename(os.path.dirname(p))) for p in paths if p not in duplicate_paths])
+
+    # Move the duplicates out of the original dataset
+    if move_duplicates and duplicates:
+        def move_duplicate(duplicate_path):
+            output_dir = os.path.join(Files.DATASET_DUPLICATES, os.path.basename(os.path.dirname(duplicate_path)))
+            os.makedirs(output_dir, exist_ok=True)
+            Files.transfer_file(duplicate_path, output_dir, Files.MOVE)
+
+        process_threads(move_duplicate, sorted(duplicate_paths), Files.IO_WORKERS, label='Moved', unit='duplicates')
+
+    # Log the throughput
+    elapsed_time = time() - start_time
+    throughput = len(paths) / elapsed_time if elapsed_time > 0 else 0
+    print(f"Deduplicated {len(paths)} images with {workers} workers in {elapsed_time:.2f} seconds "
+          f"({throughput:.2f} images/s)")
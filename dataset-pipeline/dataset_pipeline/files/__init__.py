@@ -0,0 +1,248 @@
+import errno
+import os
+import shutil
+from typing import Iterator, Optional
+
+from dataset_pipeline.parallel import process_threads
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+class Files:
+    """
+    Files utility class.
+    """
+    # Folders (executed from root folder)
+    CWD = os.getcwd()
+
+    # Directories to ignore always
+    IGNORE_DIRS = ('.git', '__pycache__', '.idea', '.vscode', '.venv', 'venv', 'env')
+
+    # Image file extensions
+    IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+    # File transfer modes
+    MOVE = 'move'
+    HARDLINK = 'hardlink'
+    REFLINK = 'reflink'
+    COPY = 'copy'
+    TRANSFER_MODES = (MOVE, HARDLINK, REFLINK, COPY)
+
+    # Linux ioctl request to clone a file, sharing its blocks on copy-on-write filesystems (Btrfs, XFS)
+    FICLONE = 0x40049409
+
+    @staticmethod
+    def scan_dir(path: str, extensions: Optional[tuple[str, ...]] = None, recursive: bool = False,
+                 include_dirs: bool = False) -> Iterator[os.DirEntry]:
+        """
+        Iterate over the entries of a folder with os.scandir.
+
+        The entries cache their type, read with the folder listing, and their stat result after the first call
+        to stat(), so no extra system call is needed to tell files from folders.
+
+        Args:
+            path (str): The path of the folder.
+            extensions (tuple[str, ...], optional): Lowercase extensions of the files to keep. Defaults to all the
+                files.
+            recursive (bool): Also iterate over the entries of the nested folders, symlinks to folders are not
+                followed.
+            include_dirs (bool): Also yield the folders.
+        Returns:
+            Iterator[os.DirEntry]: The entries, folders before their content.
+        """
+        dirs = [path]
+        while dirs:
+            with os.scandir(dirs.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        if recursive and not entry.is_symlink():
+                            dirs.append(entry.path)
+                        if include_dirs:
+                            yield entry
+                    elif extensions is None or entry.name.lower().endswith(extensions):
+                        yield entry
+
+    @classmethod
+    def scan_images(cls, path: str, recursive: bool = False) -> Iterator[os.DirEntry]:
+        """
+        Iterate over the image files of a folder with os.scandir.
+
+        Args:
+            path (str): The path of the folder.
+            recursive (bool): Also iterate over the images of the nested folders.
+        Returns:
+            Iterator[os.DirEntry]: The entries of the files with one of IMAGE_EXTENSIONS.
+        """
+        return cls.scan_dir(path, cls.IMAGE_EXTENSIONS, recursive)
+
+    @staticmethod
+    def move_file(input_path: str, output_dir: str) -> None:
+        """
+        Move file between folders.
+
+        Args:
+            input_path (str): The path of the file to be moved.
+            output_dir (str): The directory where the file should be moved.
+        """
+        if os.path.exists(input_path):
+            shutil.move(input_path, output_dir)
+
+    @staticmethod
+    def move_folder(input_dir: str, output_dir: str) -> None:
+        """
+        Move folder between folders.
+
+        Args:
+            input_dir (str): The path of the folder to be moved.
+            output_dir (str): The directory where the folder should be moved.
+        """
+        if os.path.exists(input_dir):
+            shutil.move(input_dir, output_dir)
+
+    @classmethod
+    def move_folder_content(cls, input_dir: str, output_dir: str, workers: Optional[int] = None) -> None:
+        """
+        Move folder content to another folder.
+
+        Args:
+            input_dir (str): The path of the folder whose content will be moved.
+            output_dir (str): The directory where the content should be moved.
+            workers (int, optional): Number of threads moving the items concurrently.
+        """
+        if os.path.exists(input_dir):
+            # Check if the output directory exists, if not create it
+            cls.ensure_directory_exists(output_dir)
+
+            # List the output directory once, instead of checking each item
+            output_items = {entry.name for entry in cls.scan_dir(output_dir, include_dirs=True)}
+
+            def move_item(entry: os.DirEntry) -> None:
+                # Check if it's a file and the item already exists in the output directory
+                if not entry.is_dir() and entry.name in output_items:
+                    # Delete the item if it already exists in the output directory
+                    os.remove(os.path.join(output_dir, entry.name))
+
+                # Move each item to the output directory
+                shutil.move(entry.path, output_dir)
+
+            # Move all files and folders in the input directory
+            process_threads(move_item, list(cls.scan_dir(input_dir, include_dirs=True)), workers, label='Moved',
+                            unit='items')
+
+    @staticmethod
+    def copy_file(input_path: str, output_path: str) -> None:
+        """
+        Copy a file from input path to output path.
+
+        Args:
+            input_path (str): The path of the file to be copied.
+            output_path (str): The path where the file should be copied.
+        """
+        if os.path.exists(input_path):
+            shutil.copy(input_path, output_path)
+
+    @classmethod
+    def reflink_file(cls, input_path: str, output_path: str) -> None:
+        """
+        Clone a file, the clone shares the blocks of the original file until one of them is modified.
+
+        Args:
+            input_path (str): The path of the file to be cloned.
+            output_path (str): The path of the clone.
+        Raises:
+            OSError: If the platform or the filesystem does not support cloning files.
+        """
+        if fcntl is None:
+            raise OSError(errno.EOPNOTSUPP, 'Reflinks are not supported on this platform', input_path)
+
+        with open(input_path, 'rb') as input_file, open(output_path, 'wb') as output_file:
+            try:
+                fcntl.ioctl(output_file.fileno(), cls.FICLONE, input_file.fileno())
+            except OSError:
+                output_file.close()
+                os.remove(output_path)
+                raise
+
+    @classmethod
+    def transfer_file(cls, input_path: str, output_dir: str, mode: str = COPY) -> str:
+        """
+        Transfer a file to a folder by moving, hard linking, cloning or copying it.
+
+        If the mode is not supported by the filesystem (e.g. a hard link across devices), the file is copied.
+
+        Args:
+            input_path (str): The path of the file to be transferred.
+            output_dir (str): The directory where the file should be transferred.
+            mode (str): Transfer mode, one of TRANSFER_MODES.
+        Returns:
+            str: The mode used to transfer the file, pass it to the next calls to skip failing modes.
+        """
+        output_path = os.path.join(output_dir, os.path.basename(input_path))
+
+        if mode == cls.MOVE:
+            shutil.move(input_path, output_path)
+            return mode
+        if mode not in cls.TRANSFER_MODES:
+            raise ValueError(f"Invalid transfer mode: {mode}, expected one of {cls.TRANSFER_MODES}")
+
+        # Remove the previous file, links cannot overwrite it
+        if mode != cls.COPY and os.path.lexists(output_path):
+            os.remove(output_path)
+
+        try:
+            if mode == cls.HARDLINK:
+                os.link(input_path, output_path)
+                return mode
+            if mode == cls.REFLINK:
+                cls.reflink_file(input_path, output_path)
+                return mode
+        except OSError as e:
+            print(f"Warning: {mode} is not supported for {input_path} ({e}), falling back to {cls.COPY}")
+
+        shutil.copy(input_path, output_path)
+        return cls.COPY
+
+    @staticmethod
+    def ensure_directory_exists(path: str) -> None:
+        """
+        Ensure the directory exists, if not create it.
+
+        Args:
+            path (str): The path to check and create if it doesn't exist.
+        """
+        # Check if it contains an extension
+        output_dir = os.path.dirname(path) if os.path.splitext(path)[1] else path
+
+        # Ensure the output directory exists
+        os.makedirs(output_dir, exist_ok=True)
+
+    @staticmethod
+    def ensure_file_exists(file_path: str) -> None:
+        """
+        Ensure the file exists, if not create it.
+
+        Args:
+            file_path (str): The path of the file to check and create if it doesn't exist.
+        """
+        # Ensure the directory exists
+        Files.ensure_directory_exists(os.path.dirname(file_path))
+
+        # Create the file if it does not exist
+        if not os.path.exists(file_path):
+            with open(file_path, 'w') as f:
+                pass
+
+
+    @staticmethod
+    def check_path_exists(path: str) -> bool:
+        """
+        Check if the path exists.
+
+        Args:
+            path (str): The path to check.
+        Returns:
+            bool: True if the path exists, False otherwise.
+        """
+        return os.path.exists(path)
\ No newline at end of file
@@ -0,0 +1,162 @@
+import os
+import re
+from re import Pattern
+from typing import Iterable, Iterator, Optional, Union
+
+
+class IgnoreMatcher:
+    """
+    Matcher of ignored paths, with gitignore-style patterns compiled into a single regex.
+
+    Patterns are relative to a base path and use '/' as separator:
+    - A pattern without a '/' (e.g. '*.pyc' or '.venv/') matches a name at any depth.
+    - A pattern with a '/' (e.g. 'dataset/original') is anchored to the base path.
+    - A trailing '/' only matches directories, '*' and '?' do not match '/', and '**' matches any number of
+      directories.
+    - A path inside an ignored directory is ignored too.
+
+    Compiled regex patterns are matched against the filename only, like the ignore_filenames_regex lists of Zip.
+    Negated patterns ('!') are not supported.
+    """
+
+    def __init__(self, patterns: Iterable[Union[str, Pattern]] = ()):
+        """
+        Compile the patterns.
+
+        Args:
+            patterns (Iterable[str | Pattern]): Gitignore-style patterns or compiled filename regex patterns.
+        """
+        dir_regexes = []
+        file_regexes = []
+        filename_regexes = {}
+        for pattern in patterns:
+            if not isinstance(pattern, str):
+                # Group the filename regex patterns by flags, so each group is compiled into a single regex
+                filename_regexes.setdefault(pattern.flags, []).append(pattern)
+                continue
+
+            pattern = pattern.strip()
+            if not pattern or pattern.startswith('#'):
+                continue
+
+            dir_only = pattern.endswith('/')
+            pattern = pattern.rstrip('/')
+            anchored = '/' in pattern
+            regex = self.translate(pattern.lstrip('/'))
+            if not anchored:
+                regex = '(?:.*/)?' + regex
+
+            dir_regexes.append(regex + '(?:/.*)?')
+            file_regexes.append(regex + ('/.*' if dir_only else '(?:/.*)?'))
+
+        self.dir_regex = self.combine(dir_regexes)
+        self.file_regex = self.combine(file_regexes)
+        self.filename_regexes = [regex for flags, regexes in filename_regexes.items()
+                                 for regex in self.combine_patterns(regexes, flags)]
+
+    @staticmethod
+    def combine(regexes: list[str]) -> Optional[Pattern]:
+        """
+        Combine regexes into a single compiled regex.
+
+        Args:
+            regexes (list[str]): The regexes to combine.
+        Returns:
+            Pattern | None: The compiled regex, None if there are no regexes.
+        """
+        return re.compile('|'.join(f'(?:{r})' for r in regexes)) if regexes else None
+
+    @staticmethod
+    def combine_patterns(patterns: list[Pattern], flags: int) -> list[Pattern]:
+        """
+        Combine compiled regex patterns with the same flags into a single compiled regex.
+
+        Patterns that cannot be combined, e.g. with inline global flags ('(?i)foo') or reusing a group name, are
+        matched separately instead.
+
+        Args:
+            patterns (list[Pattern]): The compiled regex patterns.
+            flags (int): The flags of the patterns.
+        Returns:
+            list[Pattern]: The combined regex, or the patterns if they cannot be combined.
+        """
+        if len(patterns) == 1:
+            return patterns
+        try:
+            return [re.compile('|'.join(f'(?:{p.pattern})' for p in patterns), flags)]
+        except re.error:
+            return patterns
+
+    @staticmethod
+    def translate(pattern: str) -> str:
+        """
+        Translate a gitignore-style glob pattern into a regex.
+
+        Args:
+            pattern (str): The glob pattern, without leading and trailing '/'.
+        Returns:
+            str: The regex.
+        """
+        regex = ''
+        i = 0
+        while i < len(pattern):
+            if pattern.startswith('**/', i):
+                regex += '(?:.*/)?'
+                i += 3
+            elif pattern.startswith('**', i):
+                regex += '.*'
+                i += 2
+            elif pattern[i] == '*':
+                regex += '[^/]*'
+                i += 1
+            elif pattern[i] == '?':
+                regex += '[^/]'
+                i += 1
+            elif pattern[i] == '[' and ']' in pattern[i + 2:]:
+                end = pattern.index(']', i + 2)
+                chars = pattern[i + 1:end].replace('\\', '\\\\')
+                regex += '[^' + chars[1:] + ']' if chars[0] == '!' else '[' + chars + ']'
+                i = end + 1
+            else:
+                regex += re.escape(pattern[i])
+                i += 1
+        return regex
+
+    def is_ignored(self, path: str, is_dir: bool = False) -> bool:
+        """
+        Check if a path is ignored.
+
+        Args:
+            path (str): Path relative to the base path, with '/' as separator.
+            is_dir (bool): Whether the path is a directory.
+        Returns:
+            bool: True if the path is ignored, False otherwise.
+        """
+        regex = self.dir_regex if is_dir else self.file_regex
+        if regex is not None and regex.fullmatch(path):
+            return True
+
+        if is_dir or not self.filename_regexes:
+            return False
+        filename = path.rsplit('/', 1)[-1]
+        return any(regex.match(filename) for regex in self.filename_regexes)
+
+    def walk(self, top: str, base_path: str) -> Iterator[tuple[str, list[str], list[str]]]:
+        """
+        Walk a directory tree like os.walk, without descending into ignored directories.
+
+        Args:
+            top (str): Directory to walk.
+            base_path (str): Base path the patterns are relative to.
+        Returns:
+            Iterator[tuple[str, list[str], list[str]]]: The path, the directories and the files that are not ignored
+                of each directory.
+        """
+        for root, dirs, filenames in os.walk(top):
+            # Get the relative path once per directory
+            rel_root = os.path.relpath(root, base_path).replace(os.sep, '/')
+            prefix = '' if rel_root == '.' else rel_root + '/'
+
+            # Prune the ignored directories, so they are not walked
+            dirs[:] = [d for d in dirs if not self.is_ignored(prefix + d, True)]
+            yield root, dirs, [f for f in filenames if not self.is_ignored(prefix + f)]
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+from typing import Iterable, Optional
+
+from dataset_pipeline.files import Files
+
+
+class Manifest:
+    """
+    Manifest of the files processed by a dataset stage.
+
+    The manifest is a JSON Lines file, the first line stores the stage parameters and each following line
+    stores an input file (path, size, mtime, content hash and output paths). Entries are appended as soon
+    as they are processed, so an interrupted run resumes where it stopped. If the parameters change, the
+    previous entries are discarded and their outputs removed, as are the outputs of the removed input files.
+    """
+
+    # Chunk size used to hash the files
+    HASH_CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, path: str, parameters: dict):
+        """
+        Load the manifest if it exists.
+
+        Args:
+            path (str): Path of the manifest file.
+            parameters (dict): Parameters of the stage, entries recorded with other parameters are ignored.
+        """
+        self.path = path
+        self.parameters = parameters
+        self.entries = {}
+
+        # Only keep the entries if they were recorded with the same parameters, otherwise remove their outputs
+        stored_parameters, entries = self.read(path)
+        if stored_parameters == parameters:
+            self.entries = entries
+        else:
+            self.remove_outputs(entries.values())
+
+        # Rewrite the manifest without stale or duplicated entries
+        self.save()
+
+    @staticmethod
+    def read(path: str) -> tuple[Optional[dict], dict[str, dict]]:
+        """
+        Read a manifest file without modifying it.
+
+        Args:
+            path (str): Path of the manifest file.
+        Returns:
+            tuple[dict | None, dict[str, dict]]: The parameters and the entries by input file, the parameters
+                are None if the manifest does not exist.
+        """
+        if not os.path.exists(path):
+            return None, {}
+
+        with open(path, 'r') as f:
+            lines = f.read().splitlines()
+        if not lines:
+            return None, {}
+
+        entries = {}
+        for line in lines[1:]:
+            # Skip the last line if it was truncated by an interrupted run
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            entries[entry['source']] = entry
+        return json.loads(lines[0]).get('parameters'), entries
+
+    @staticmethod
+    def remove_outputs(entries: Iterable[dict], keep: Iterable[str] = ()) -> int:
+        """
+        Remove the output files of manifest entries.
+
+        Args:
+            entries (Iterable[dict]): The manifest entries.
+            keep (Iterable[str]): Output paths that are not removed, e.g. the outputs of the entry that replaces them.
+        Returns:
+            int: The number of removed files.
+        """
+        keep = set(keep)
+
+        removed = 0
+        for entry in entries:
+            for output_path in entry['outputs']:
+                if output_path in keep:
+                    continue
+                try:
+                    os.remove(output_path)
+                except FileNotFoundError:
+                    continue
+                removed += 1
+        return removed
+
+    @classmethod
+    def hash_file(cls, path: str) -> str:
+        """
+        Hash the content of a file.
+
+        Args:
+            path (str): Path of the file.
+        Returns:
+            str: The SHA-1 hex digest of the file content.
+        """
+        file_hash = hashlib.sha1()
+        with open(path, 'rb') as f:
+            while chunk := f.read(cls.HASH_CHUNK_SIZE):
+                file_hash.update(chunk)
+        return file_hash.hexdigest()
+
+    @classmethod
+    def create_entry(cls, input_path: str, output_paths: list[str], file_hash: Optional[str] = None,
+                     hash_content: bool = True) -> dict:
+        """
+        Create the entry of a processed file.
+
+        Args:
+            input_path (str): Path of the input file.
+            output_paths (list[str]): Paths of the files generated from the input file.
+            file_hash (str, optional): Content hash of the input file, computed if not given.
+            hash_content (bool): Compute the content hash if not given. Otherwise the entry only records the size
+                and mtime of the file, so it is processed again whenever they change.
+        Returns:
+            dict: The manifest entry.
+        """
+        if file_hash is None and hash_content:
+            file_hash = cls.hash_file(input_path)
+
+        stat = os.stat(input_path)
+        return {
+            'source': input_path,
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+            'hash': file_hash,
+            'outputs': output_paths,
+        }
+
+    def is_processed(self, input_path: str, existing_paths: Optional[set[str]] = None) -> bool:
+        """
+        Check if an input file was already processed and its outputs still exist.
+
+        The content hash is only computed if the size or mtime of the file changed, and the entry has a hash.
+
+        Args:
+            input_path (str): Path of the input file.
+            existing_paths (set[str], optional): Paths of the files in the output directory, listed once by the
+                caller, so the outputs are not checked one by one.
+        Returns:
+            bool: True if the file can be skipped, False otherwise.
+        """
+        entry = self.entries.get(input_path)
+        if entry is None:
+            return False
+        if existing_paths is not None:
+            if not all(p in existing_paths for p in entry['outputs']):
+                return False
+        elif not all(os.path.exists(p) for p in entry['outputs']):
+            return False
+
+        stat = os.stat(input_path)
+        if stat.st_size == entry['size'] and stat.st_mtime_ns == entry['mtime']:
+            return True
+
+        # The file was touched, check if its content changed, unless the entry was recorded without its hash
+        if entry['hash'] is None:
+            return False
+        file_hash = self.hash_file(input_path)
+        if file_hash != entry['hash']:
+            return False
+        self.add([self.create_entry(input_path, entry['outputs'], file_hash)])
+        return True
+
+    def add(self, entries: list[dict]) -> None:
+        """
+        Add entries to the manifest and append them to the manifest file.
+
+        The outputs of the previous entry of a file that are not outputs of its new entry are removed.
+
+        Args:
+            entries (list[dict]): The manifest entries.
+        """
+        with open(self.path, 'a') as f:
+            for entry in entries:
+                previous_entry = self.entries.get(entry['source'])
+                if previous_entry is not None:
+                    self.remove_outputs([previous_entry], keep=entry['outputs'])
+                self.entries[entry['source']] = entry
+                f.write(json.dumps(entry) + '\n')
+
+    def save(self, sources: Optional[list[str]] = None) -> None:
+        """
+        Rewrite the manifest file.
+
+        Args:
+            sources (list[str], optional): Input files to keep, the entries and outputs of other files are removed.
+        """
+        if sources is not None:
+            sources = set(sources)
+            self.remove_outputs(entry for source, entry in self.entries.items() if source not in sources)
+            self.entries = {s: entry for s, entry in self.entries.items() if s in sources}
+
+        # Write to a temporary file first, so an interrupted write does not corrupt the manifest
+        Files.ensure_directory_exists(os.path.dirname(self.path))
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(json.dumps({'parameters': self.parameters}) + '\n')
+            for entry in self.entries.values():
+                f.write(json.dumps(entry) + '\n')
+        os.replace(tmp_path, self.path)
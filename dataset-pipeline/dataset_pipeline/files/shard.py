@@ -0,0 +1,173 @@
+import io
+import json
+import os
+import tarfile
+from typing import Iterator, Optional, Union
+
+from dataset_pipeline.files import Files
+
+
+class ShardWriter:
+    """
+    Class for packing samples into size-capped tar shards, in the WebDataset layout.
+
+    Each sample is a group of consecutive tar members that share the same key, one member per field
+    (e.g. 'glass/img_0.jpg' and 'glass/img_0.cls'). An index with the shards and their number of samples
+    is written when the writer is closed, and the shards of previous runs that are not in it are removed.
+    """
+
+    # Name of the index file
+    INDEX_FILENAME = 'index.json'
+
+    def __init__(self, output_dir: str, max_size: int, prefix: str = 'shard'):
+        """
+        Initialize the shard writer.
+
+        Args:
+            output_dir (str): Directory where the shards are written.
+            max_size (int): Maximum size in bytes of a shard, a shard holds at least one sample.
+            prefix (str): Prefix of the shard filenames.
+        """
+        self.output_dir = output_dir
+        self.max_size = max_size
+        self.prefix = prefix
+        self.shards = []
+        self.tar = None
+        self.size = 0
+        self.count = 0
+        self.removed_shards = []
+
+        # Check if the output directory exists, if not create it
+        Files.ensure_directory_exists(output_dir)
+
+    def __enter__(self) -> 'ShardWriter':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _close_shard(self) -> None:
+        """
+        Close the current shard and record it in the index.
+        """
+        if self.tar is None:
+            return
+        self.tar.close()
+        self.shards.append({'name': os.path.basename(self.tar.name), 'samples': self.count, 'size': self.size})
+        self.tar = None
+
+    def _open_shard(self) -> None:
+        """
+        Open the next shard.
+        """
+        shard_path = os.path.join(self.output_dir, f'{self.prefix}-{len(self.shards):05d}.tar')
+        self.tar = tarfile.open(shard_path, 'w')
+        self.size = 0
+        self.count = 0
+
+    def write(self, key: str, fields: dict[str, Union[bytes, str]]) -> None:
+        """
+        Write a sample.
+
+        Args:
+            key (str): Key of the sample, unique within the shards.
+            fields (dict[str, bytes | str]): Fields of the sample by extension, either the content or the path
+                of a file to copy.
+        """
+        # Get the size of each field
+        sizes = {ext: os.path.getsize(value) if isinstance(value, str) else len(value)
+                 for ext, value in fields.items()}
+        sample_size = sum(sizes.values())
+
+        # Start a new shard if the sample does not fit in the current one
+        if self.tar is not None and self.count > 0 and self.size + sample_size > self.max_size:
+            self._close_shard()
+        if self.tar is None:
+            self._open_shard()
+
+        for ext, value in fields.items():
+            info = tarfile.TarInfo(f'{key}.{ext}')
+            info.size = sizes[ext]
+            if isinstance(value, str):
+                with open(value, 'rb') as f:
+                    self.tar.addfile(info, f)
+            else:
+                self.tar.addfile(info, io.BytesIO(value))
+
+        self.size += sample_size
+        self.count += 1
+
+    def _remove_stale_shards(self) -> None:
+        """
+        Remove the shards that are not in the index, e.g. written by a previous run with more shards.
+        """
+        names = {shard['name'] for shard in self.shards}
+        for entry in list(Files.scan_dir(self.output_dir, ('.tar',))):
+            if entry.name.startswith(f'{self.prefix}-') and entry.name not in names:
+                os.remove(entry.path)
+                self.removed_shards.append(entry.name)
+
+    def close(self) -> None:
+        """
+        Close the last shard, write the index and remove the stale shards.
+        """
+        self._close_shard()
+
+        index = {'samples': sum(shard['samples'] for shard in self.shards), 'shards': self.shards}
+        with open(os.path.join(self.output_dir, self.INDEX_FILENAME), 'w') as f:
+            json.dump(index, f, indent=2)
+        self._remove_stale_shards()
+
+
+class ShardReader:
+    """
+    Class for streaming the samples of the tar shards written by ShardWriter.
+    """
+
+    def __init__(self, input_dir: str):
+        """
+        Load the index of the shards.
+
+        Args:
+            input_dir (str): Directory of the shards.
+        """
+        self.input_dir = input_dir
+        with open(os.path.join(input_dir, ShardWriter.INDEX_FILENAME), 'r') as f:
+            self.index = json.load(f)
+
+    def __len__(self) -> int:
+        return self.index['samples']
+
+    def __iter__(self) -> Iterator[tuple[str, dict[str, bytes]]]:
+        return self.read()
+
+    def read(self, shards: Optional[list[str]] = None) -> Iterator[tuple[str, dict[str, bytes]]]:
+        """
+        Read the samples sequentially, one shard at a time.
+
+        Args:
+            shards (list[str], optional): Names of the shards to read. Defaults to all the shards.
+        Returns:
+            Iterator[tuple[str, dict[str, bytes]]]: The key and the fields by extension of each sample.
+        """
+        if shards is None:
+            shards = [shard['name'] for shard in self.index['shards']]
+
+        for shard in shards:
+            key, fields = None, {}
+
+            # Open the shard in stream mode, members are read in order without seeking
+            with tarfile.open(os.path.join(self.input_dir, shard), 'r|') as tar:
+                for member in tar:
+                    if not member.isfile():
+                        continue
+
+                    member_key, ext = member.name.rsplit('.', 1)
+                    if member_key != key and fields:
+                        yield key, fields
+                        fields = {}
+                    key = member_key
+                    fields[ext] = tar.extractfile(member).read()
+
+            if fields:
+                yield key, fields
@@ -0,0 +1,525 @@
+import hashlib
+import json
+import os
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatch
+from time import perf_counter
+from zipfile import ZipFile, ZipInfo, ZIP_DEFLATED, ZIP_STORED
+from re import Pattern
+from typing import Iterator, Optional, Union
+
+from dataset_pipeline.files import Files
+from dataset_pipeline.files.ignore import IgnoreMatcher
+from dataset_pipeline.files.manifest import Manifest
+from dataset_pipeline.parallel import batch, get_io_workers
+
+
+class Zip:
+    """
+    Class for zipping files and folders.
+    """
+
+    # Extensions of already compressed files, they are stored without compression
+    STORED_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif', '.zip', '.gz', '.7z')
+
+    # Number of members read concurrently before being appended to the zip file
+    BATCH_SIZE = 64
+
+    # Suffix of the index written next to the parts of a multi-part archive, and prefix of the part names
+    PARTS_INDEX_SUFFIX = '.index.json'
+    PARTS_PREFIX = '.part'
+
+    # Ratio between the maximum and the average size of the parts, higher values fill the parts less but rarely cut
+    # them at the maximum size
+    PARTS_TARGET_RATIO = 4
+
+    # Size of the local file header and central directory record of a member, without its name and extras
+    MEMBER_HEADER_SIZE = 30 + 46
+
+    # Size of the end of central directory record
+    END_RECORD_SIZE = 22
+
+    @classmethod
+    def get_compress_type(cls, filename: str, default: int = ZIP_DEFLATED) -> int:
+        """
+        Get the compression method of a file from its extension.
+
+        Args:
+            filename (str): Name of the file.
+            default (int): Compression method of the files that are not already compressed.
+        Returns:
+            int: ZIP_STORED for already compressed files, the default compression method otherwise.
+        """
+        return ZIP_STORED if filename.lower().endswith(cls.STORED_EXTENSIONS) else default
+
+    @staticmethod
+    def read_member(file_path: str, arcname: str) -> tuple[ZipInfo, bytes]:
+        """
+        Read a file into a zip member, this can run in a worker thread.
+
+        Args:
+            file_path (str): Path of the file.
+            arcname (str): Name of the member in the zip.
+        Returns:
+            tuple[ZipInfo, bytes]: The member info, with the file timestamp and permissions, and the file content.
+        """
+        zinfo = ZipInfo.from_file(file_path, arcname)
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        return zinfo, data
+
+    @classmethod
+    def read_members(cls, members: list[tuple[str, str]],
+                     workers: Optional[int] = None) -> Iterator[tuple[ZipInfo, bytes]]:
+        """
+        Read files into zip members, in worker threads if more than one worker is requested.
+
+        Args:
+            members (list[tuple[str, str]]): List of (file path, name in the zip) tuples.
+            workers (int, optional): Number of threads. Defaults to the number of CPUs plus four, up to 32.
+        Returns:
+            Iterator[tuple[ZipInfo, bytes]]: The info and content of each member, in order.
+        """
+        workers = get_io_workers(workers)
+        if workers == 1:
+            yield from (cls.read_member(*member) for member in members)
+            return
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Read a batch concurrently, so at most one batch is held in memory
+            for b in batch(members, cls.BATCH_SIZE):
+                yield from executor.map(lambda member: cls.read_member(*member), b)
+
+    @classmethod
+    def write_member(cls, zipf: ZipFile, zinfo: ZipInfo, data: bytes, default_compress_type: int,
+                     compresslevel: Optional[int] = None) -> None:
+        """
+        Append a member to a zip file, choosing its compression method from its extension.
+
+        Args:
+            zipf (ZipFile): ZipFile object to write to.
+            zinfo (ZipInfo): Member info, its compressed size is set once it is written.
+            data (bytes): Content of the member.
+            default_compress_type (int): Compression method of the files that are not already compressed.
+            compresslevel (int, optional): Compression level of the default compression method.
+        """
+        zipf.writestr(zinfo, data, compress_type=cls.get_compress_type(zinfo.filename, default_compress_type),
+                      compresslevel=compresslevel)
+
+    @classmethod
+    def write_members(cls, zipf: ZipFile, members: list[tuple[str, str]], workers: Optional[int] = None) -> None:
+        """
+        Write files to a zip file, choosing the compression method of each file from its extension.
+
+        With more than one worker, the files are read in worker threads and appended to the zip file in order by
+        the calling thread.
+
+        Args:
+            zipf (ZipFile): ZipFile object to write to, its compression is used for the files that are not
+                already compressed.
+            members (list[tuple[str, str]]): List of (file path, name in the zip) tuples.
+            workers (int, optional): Number of threads. Defaults to the number of CPUs plus four, up to 32.
+        """
+        start_time = perf_counter()
+        workers = get_io_workers(workers)
+        size = 0
+
+        for zinfo, data in cls.read_members(members, workers):
+            cls.write_member(zipf, zinfo, data, zipf.compression, zipf.compresslevel)
+            size += zinfo.file_size
+
+        # Log the throughput
+        elapsed_time = perf_counter() - start_time
+        throughput = size / 1024 ** 2 / elapsed_time if elapsed_time > 0 else 0
+        print(f'Zipped {len(members)} files ({size / 1024 ** 2:.2f} MB) with {workers} threads in '
+              f'{elapsed_time:.2f} seconds ({throughput:.2f} MB/s)')
+
+    @classmethod
+    def get_parts_index_path(cls, output_path: str) -> str:
+        """
+        Get the path of the index of a multi-part archive.
+
+        Args:
+            output_path (str): Path of the archive, e.g. 'organized.zip'.
+        Returns:
+            str: The path of the index, e.g. 'organized.index.json'.
+        """
+        return os.path.splitext(output_path)[0] + cls.PARTS_INDEX_SUFFIX
+
+    @classmethod
+    def is_part_boundary(cls, name: str, size: int, max_size: int) -> bool:
+        """
+        Check whether a part of a multi-part archive ends after a member.
+
+        The check only depends on the name and size of the member, with a probability proportional to its size, so
+        the parts average max_size / PARTS_TARGET_RATIO bytes and adding or removing a member only changes its part.
+
+        Args:
+            name (str): Name of the member in the zip.
+            size (int): Size in bytes of the member in the part.
+            max_size (int): Maximum size in bytes of a part.
+        Returns:
+            bool: Whether the part ends after the member.
+        """
+        digest = hashlib.blake2b(name.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, 'big') / 2 ** 64 < cls.PARTS_TARGET_RATIO * size / max_size
+
+    @classmethod
+    def get_part_path(cls, output_path: str, first_member: str) -> str:
+        """
+        Get the path of a part of a multi-part archive, named after its first member.
+
+        Args:
+            output_path (str): Path of the archive, e.g. 'organized.zip'.
+            first_member (str): Name of the first member of the part.
+        Returns:
+            str: The path of the part, e.g. 'organized.part-1a2b3c4d.zip'.
+        """
+        digest = hashlib.blake2b(first_member.encode(), digest_size=4).hexdigest()
+        return f'{os.path.splitext(output_path)[0]}{cls.PARTS_PREFIX}-{digest}.zip'
+
+    @classmethod
+    def remove_stale_parts(cls, output_path: str, parts: list[dict]) -> list[str]:
+        """
+        Remove the parts of an archive that are not in its index, e.g. written by a previous run.
+
+        Args:
+            output_path (str): Path of the archive.
+            parts (list[dict]): The parts of the index.
+        Returns:
+            list[str]: The names of the removed parts.
+        """
+        output_dir = os.path.dirname(output_path) or '.'
+        prefix = os.path.basename(os.path.splitext(output_path)[0]) + cls.PARTS_PREFIX
+        names = {part['name'] for part in parts}
+
+        removed_parts = []
+        for entry in list(Files.scan_dir(output_dir, ('.zip',))):
+            if entry.name.startswith(prefix) and entry.name not in names:
+                os.remove(entry.path)
+                removed_parts.append(entry.name)
+        return removed_parts
+
+    @classmethod
+    def write_parts(cls, output_path: str, members: list[tuple[str, str]], max_size: int,
+                    compression: int = ZIP_DEFLATED, compresslevel: Optional[int] = None,
+                    workers: Optional[int] = None) -> dict:
+        """
+        Write files to size-capped zip parts, with an index of the parts.
+
+        Each part is a standalone zip file named after the archive and its first member (e.g.
+        'organized.part-1a2b3c4d.zip'), so the parts can be transferred and extracted independently. The index maps
+        each member to its part and stores the size and checksum of each part, so only the parts that changed need
+        to be transferred again.
+
+        The members are sorted by name, and a part only holds the members of one directory. A part ends after
+        the members chosen by is_part_boundary, or when the next member does not fit in it. Adding or removing a
+        file therefore only changes its part, and the other parts keep their names and checksums. The parts of
+        previous runs that are not in the new index are removed.
+
+        Args:
+            output_path (str): Path of the archive, used to name the parts and the index.
+            members (list[tuple[str, str]]): List of (file path, name in the zip) tuples.
+            max_size (int): Maximum size in bytes of a part, a part holds at least one member.
+            compression (int): Compression method of the files that are not already compressed, ZIP_STORED or
+                ZIP_DEFLATED.
+            compresslevel (int, optional): Compression level of ZIP_DEFLATED.
+            workers (int, optional): Number of threads reading the files.
+        Returns:
+            dict: The index of the parts.
+        """
+        start_time = perf_counter()
+        Files.ensure_directory_exists(output_path)
+        members = sorted(members, key=lambda member: member[1])
+
+        parts = []
+        index_members = {}
+        zipf = None
+        part_size = 0
+        part_dir = None
+
+        def close_part() -> None:
+            zipf.close()
+            parts[-1]['size'] = os.path.getsize(zipf.filename)
+            parts[-1]['sha1'] = Manifest.hash_file(zipf.filename)
+
+        for zinfo, data in cls.read_members(members, workers):
+            # Start a new part if the member is in another directory or does not fit in the current one, the
+            # uncompressed size is used since the compressed size is only known once the member is written
+            member_size = cls.MEMBER_HEADER_SIZE + 2 * len(zinfo.filename.encode()) + len(data)
+            member_dir = posixpath.dirname(zinfo.filename)
+            if zipf is not None and (member_dir != part_dir or part_size + member_size > max_size):
+                close_part()
+                zipf = None
+            if zipf is None:
+                part_path = cls.get_part_path(output_path, zinfo.filename)
+                zipf = ZipFile(part_path, 'w', compression)
+                parts.append({'name': os.path.basename(part_path), 'members': 0})
+                part_size = cls.END_RECORD_SIZE
+                part_dir = member_dir
+
+            cls.write_member(zipf, zinfo, data, compression, compresslevel)
+            part_size += member_size - zinfo.file_size + zinfo.compress_size
+            parts[-1]['members'] += 1
+            index_members[zinfo.filename] = parts[-1]['name']
+
+            # End the part after a member chosen by its name and size
+            if cls.is_part_boundary(zinfo.filename, member_size, max_size):
+                close_part()
+                zipf = None
+        if zipf is not None:
+            close_part()
+
+        # Write the index next to the parts, and remove the parts of the previous runs
+        index = {'max_size': max_size, 'parts': parts, 'members': index_members}
+        with open(cls.get_parts_index_path(output_path), 'w') as f:
+            json.dump(index, f, indent=2)
+        removed_parts = cls.remove_stale_parts(output_path, parts)
+
+        # Log the throughput
+        elapsed_time = perf_counter() - start_time
+        size = sum(part['size'] for part in parts)
+        print(f'Zipped {len(members)} files into {len(parts)} parts ({size / 1024 ** 2:.2f} MB) in '
+              f'{elapsed_time:.2f} seconds, removed {len(removed_parts)} stale parts')
+        return index
+
+    @classmethod
+    def verify_parts(cls, output_path: str) -> list[str]:
+        """
+        Check the parts of a multi-part archive against the checksums of its index.
+
+        Args:
+            output_path (str): Path of the archive given to write_parts.
+        Returns:
+            list[str]: The names of the parts that are missing or whose checksum does not match.
+        """
+        with open(cls.get_parts_index_path(output_path), 'r') as f:
+            index = json.load(f)
+
+        invalid_parts = []
+        for part in index['parts']:
+            part_path = os.path.join(os.path.dirname(output_path), part['name'])
+            if not os.path.exists(part_path) or os.path.getsize(part_path) != part['size'] or \
+                    Manifest.hash_file(part_path) != part['sha1']:
+                invalid_parts.append(part['name'])
+        return invalid_parts
+
+    @staticmethod
+    def get_ignore_matcher(ignore_dirs: Optional[list[str]] = None,
+                           ignore_filenames_regex: Optional[list[Pattern]] = None) -> IgnoreMatcher:
+        """
+        Compile the ignore lists into a matcher, adding the directories that should be always ignored.
+
+        Args:
+            ignore_dirs (list[str], optional): List of gitignore-style patterns of the directories to ignore.
+            ignore_filenames_regex (list[Pattern], optional): List of regex patterns to ignore certain files.
+        Returns:
+            IgnoreMatcher: The compiled matcher.
+        """
+        dir_patterns = [d.rstrip('/') + '/' for d in (*Files.IGNORE_DIRS, *(ignore_dirs or []))]
+        return IgnoreMatcher([*dir_patterns, *(ignore_filenames_regex or [])])
+
+    @classmethod
+    def get_members(cls, filenames: list, input_file_base_path: str, input_base_path: str,
+                    ignore_filenames_regex: Optional[list[Pattern]] = None,
+                    ignore: Optional[IgnoreMatcher] = None) -> list[tuple[str, str]]:
+        """
+        Get the zip members of the files in a folder.
+
+        Args:
+            filenames (list): List of filenames to zip.
+            input_file_base_path (str): Base path of the files to be zipped.
+            input_base_path (str): Base path for relative file paths in the zip.
+            ignore_filenames_regex (list[Pattern], optional): List of regex patterns to ignore certain files.
+            ignore (IgnoreMatcher, optional): Matcher of the ignored paths, relative to the base path. Defaults to
+                a matcher of the ignored filenames and the directories that should be always ignored.
+        Returns:
+            list[tuple[str, str]]: List of (file path, name in the zip) tuples.
+        """
+        if ignore is None:
+            ignore = cls.get_ignore_matcher(ignore_filenames_regex=ignore_filenames_regex)
+
+        # Get the relative path of the folder once
+        rel_base_path = os.path.relpath(input_file_base_path, input_base_path)
+
+        members = []
+        for filename in filenames:
+            # Skip the file if it is ignored
+            rel_path = os.path.normpath(os.path.join(rel_base_path, filename))
+            if ignore.is_ignored(rel_path.replace(os.sep, '/')):
+                continue
+
+            members.append((os.path.join(input_file_base_path, filename), rel_path))
+        return members
+
+    @classmethod
+    def zip_files(cls, zipf: ZipFile, filenames: list, input_file_base_path: str, input_base_path: str,
+                  ignore_filenames_regex: Optional[list[Pattern]] = None, workers: Optional[int] = None) -> None:
+        """
+        Define the function to zip the files in a folder.
+
+        Args:
+            zipf (ZipFile): ZipFile object to write to.
+            filenames (list): List of filenames to zip.
+            input_file_base_path (str): Base path of the files to be zipped.
+            input_base_path (str): Base path for relative file paths in the zip.
+            ignore_filenames_regex (list[Pattern], optional): List of regex patterns to ignore certain files.
+            workers (int, optional): Number of threads reading the files.
+        """
+        members = cls.get_members(filenames, input_file_base_path, input_base_path, ignore_filenames_regex)
+        cls.write_members(zipf, members, workers)
+
+    @classmethod
+    def zip_not_nested_folder(cls, zipf: ZipFile, input_base_path: str, input_folder_path: str,
+                              ignore_filenames_regex: list = None, workers: Optional[int] = None) -> None:
+        """
+        Define the function to zip a folder, this ignores nested folders.
+
+        Args:
+            zipf (ZipFile): ZipFile object to write to.
+            input_base_path (str): Base path for relative file paths in the zip.
+            input_folder_path (str): Path of the folder to be zipped.
+            ignore_filenames_regex (list[Pattern], optional): List of regex patterns to ignore certain files.
+            workers (int, optional): Number of threads reading the files.
+        """
+        # Get the list of files in the specified folder
+        filenames = [entry.name for entry in Files.scan_dir(input_folder_path)]
+
+        # Zip the files in the folder
+        cls.zip_files(zipf, filenames, input_folder_path, input_base_path, ignore_filenames_regex, workers)
+
+        # Log
+        input_folder_rel_path = os.path.relpath(input_folder_path, input_base_path)
+        print(f'Zipped folder: {input_folder_rel_path}')
+
+    @classmethod
+    def get_nested_members(cls, input_base_path: str, input_folder_path: str, ignore_dirs: list[str] = None,
+                           ignore_filenames_regex: list[Pattern] = None) -> list[tuple[str, str]]:
+        """
+        Get the zip members of the files in a folder, this includes nested folders.
+
+        Args:
+            input_base_path (str): Base path for relative file paths in the zip.
+            input_folder_path (str): Path of the folder to be zipped.
+            ignore_dirs (list[str], optional): List of gitignore-style patterns of the directories to ignore.
+            ignore_filenames_regex (list[Pattern], optional): List of regex patterns to ignore certain files.
+        Returns:
+            list[tuple[str, str]]: List of (file path, name in the zip) tuples.
+        """
+        ignore = cls.get_ignore_matcher(ignore_dirs, ignore_filenames_regex)
+
+        members = []
+        for root, _, filenames in ignore.walk(input_folder_path, input_base_path):
+            # Get the files in its subfolders, the ignored directories are not walked
+            rel_root = os.path.relpath(root, input_base_path)
+            members += [(os.path.join(root, f), os.path.normpath(os.path.join(rel_root, f))) for f in filenames]
+        return members
+
+    @classmethod
+    def zip_nested_folder(cls, zipf: ZipFile, input_base_path: str, input_folder_path: str,
+                          ignore_dirs: list[str] = None, ignore_filenames_regex: list[Pattern] = None,
+                          workers: Optional[int] = None) -> None:
+        """
+        Define the function to zip a folder, this includes nested folders.
+
+        Args:
+            zipf (ZipFile): ZipFile object to write to.
+            input_base_path (str): Base path for relative file paths in the zip.
+            input_folder_path (str): Path of the folder to be zipped.
+            ignore_dirs (list[str], optional): List of gitignore-style patterns of the directories to ignore.
+            ignore_filenames_regex (list[Pattern], optional): List of regex patterns to ignore certain files.
+            workers (int, optional): Number of threads reading the files.
+        """
+        members = cls.get_nested_members(input_base_path, input_folder_path, ignore_dirs, ignore_filenames_regex)
+
+        # Zip the files of all the subfolders at once
+        cls.write_members(zipf, members, workers)
+
+        # Log
+        input_folder_rel_path = os.path.relpath(input_folder_path, input_base_path)
+        print(f'Zipped folder: {input_folder_rel_path}')
+
+    @staticmethod
+    def get_member_path(output_dir: str, name: str) -> str:
+        """
+        Get the path where a member is extracted, dropping the absolute and parent components like ZipFile.extract.
+
+        Args:
+            output_dir (str): Directory where the files are extracted.
+            name (str): Name of the member in the zip.
+        Returns:
+            str: The path of the extracted member.
+        """
+        parts = [p for p in os.path.splitdrive(name)[1].split('/') if p not in ('', os.curdir, os.pardir)]
+        return os.path.join(output_dir, *parts)
+
+    @staticmethod
+    def match_member(name: str, include: list[Union[str, Pattern]]) -> bool:
+        """
+        Check if a member matches any filter.
+
+        Args:
+            name (str): Name of the member in the zip.
+            include (list[str | Pattern]): Glob patterns (e.g. '*/val/*') or compiled regex patterns.
+        Returns:
+            bool: True if the member matches any filter, False otherwise.
+        """
+        return any(fnmatch(name, f) if isinstance(f, str) else f.match(name) for f in include)
+
+    @classmethod
+    def extract_all(cls, zip_path: str, output_dir: str, include: Optional[list[Union[str, Pattern]]] = None,
+                    workers: Optional[int] = None) -> list[str]:
+        """
+        Extract the files of a zip file, in parallel.
+
+        The directories are created once before extracting. Each thread opens its own handle of the zip file and
+        extracts a contiguous range of members, so the threads do not share a file position.
+
+        Args:
+            zip_path (str): Path to the zip file.
+            output_dir (str): Directory where files will be extracted.
+            include (list[str | Pattern], optional): Glob patterns or compiled regex patterns of the members to
+                extract. Defaults to all the members.
+            workers (int, optional): Number of threads. Defaults to the number of CPUs plus four, up to 32.
+        Returns:
+            list[str]: The names of the extracted members.
+        """
+        start_time = perf_counter()
+
+        # Check if the path exists, if not it creates it
+        Files.ensure_directory_exists(output_dir)
+
+        with ZipFile(zip_path, "r") as zip_ref:
+            members = [zinfo for zinfo in zip_ref.infolist()
+                       if include is None or cls.match_member(zinfo.filename, include)]
+
+        # Create the directories of the members
+        dirs = {cls.get_member_path(output_dir, zinfo.filename) if zinfo.is_dir() else
+                os.path.dirname(cls.get_member_path(output_dir, zinfo.filename)) for zinfo in members}
+        for d in sorted(dirs):
+            os.makedirs(d, exist_ok=True)
+
+        def extract_range(zinfos: list[ZipInfo]) -> None:
+            with ZipFile(zip_path, "r") as thread_zip_ref:
+                for zinfo in zinfos:
+                    thread_zip_ref.extract(zinfo, output_dir)
+
+        # Extract the files in contiguous ranges, one range per thread
+        files = [zinfo for zinfo in members if not zinfo.is_dir()]
+        workers = min(get_io_workers(workers), max(1, len(files)))
+        ranges = batch(files, -(-len(files) // workers))
+        if workers == 1:
+            for r in ranges:
+                extract_range(r)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(extract_range, ranges))
+
+        # Log the throughput
+        elapsed_time = perf_counter() - start_time
+        size = sum(zinfo.file_size for zinfo in files)
+        throughput = size / 1024 ** 2 / elapsed_time if elapsed_time > 0 else 0
+        print(f'Extracted {len(files)} files ({size / 1024 ** 2:.2f} MB) with {workers} threads in '
+              f'{elapsed_time:.2f} seconds ({throughput:.2f} MB/s)')
+        return [zinfo.filename for zinfo in files]
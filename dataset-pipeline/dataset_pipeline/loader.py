@@ -0,0 +1,192 @@
+import hashlib
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from dataset_pipeline.config import Files
+from dataset_pipeline.parallel import batch, get_workers
+
+
+def get_sample_seed(seed, epoch, index):
+    """
+    Get the seed of the augmentations of a sample in an epoch.
+
+    The seed only depends on its arguments, so the augmentations do not depend on which worker loads the sample.
+
+    Args:
+        seed (int): Seed of the augmentations.
+        epoch (int): The epoch.
+        index (int): Index of the sample.
+    Returns:
+        int: The 32-bit seed.
+    """
+    digest = hashlib.blake2b(f'{seed}:{epoch}:{index}'.encode(), digest_size=4).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def augment_sample(image, seed, rgb=False):
+    """
+    Apply the augmentation pipeline to an image with a seed.
+
+    Args:
+        image (np.ndarray): The image.
+        seed (int): Seed of the augmentations.
+        rgb (bool): Whether the image is in RGB, otherwise it is in OpenCV's BGR order and is only converted if
+            Files.AUGMENTATION_REQUIRES_RGB is set.
+    Returns:
+        np.ndarray: The augmented image, in the same channel order.
+    """
+    # Import the augmentation stage here, so only the training loads OpenCV and albumentations
+    import cv2
+    from dataset_pipeline.augment import get_transform
+
+    convert = Files.AUGMENTATION_REQUIRES_RGB and not rgb
+    if convert:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+    # The pipeline is shared by the images with the same shape, so it is seeded before each image
+    transform = get_transform(image.shape[0], image.shape[1])
+    transform.set_random_seed(seed)
+    image = transform(image=image)['image']
+
+    if convert:
+        image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+    return image
+
+
+class OnlineAugmenter:
+    """
+    Augmenter of the training images on the fly, with seeded per-epoch randomness.
+
+    The epoch is stored in shared memory, so the data loader workers started before an epoch see its updates.
+    """
+
+    def __init__(self, seed=None):
+        """
+        Initialize the augmenter at the first epoch.
+
+        Args:
+            seed (int, optional): Seed of the augmentations.
+        """
+        self.seed = Files.AUGMENTATION_SEED if seed is None else seed
+        self.epoch = multiprocessing.Value('i', 0)
+
+    def set_epoch(self, epoch):
+        """
+        Set the current epoch, which changes the augmentations of every sample.
+
+        Args:
+            epoch (int): The epoch.
+        """
+        self.epoch.value = epoch
+
+    def __call__(self, image, index, rgb=False):
+        """
+        Augment a sample.
+
+        Args:
+            image (np.ndarray): The image of the sample.
+            index (int): Index of the sample.
+            rgb (bool): Whether the image is in RGB, otherwise it is in OpenCV's BGR order.
+        Returns:
+            np.ndarray: The augmented image.
+        """
+        return augment_sample(image, get_sample_seed(self.seed, self.epoch.value, index), rgb)
+
+
+def get_samples(input_dir=None):
+    """
+    Get the samples of a split of the organized dataset.
+
+    Args:
+        input_dir (str, optional): Folder of the split, with a subfolder per class. Defaults to the training split.
+    Returns:
+        list[tuple[str, int]]: The image path and label of each sample, sorted by class and filename.
+    """
+    input_dir = Files.DATASET_ORGANIZED_TRAINING if input_dir is None else input_dir
+
+    samples = []
+    for label, model_class in enumerate(Files.MODEL_CLASSES):
+        class_dir = os.path.join(input_dir, model_class)
+        if not os.path.isdir(class_dir):
+            continue
+        samples += [(entry.path, label) for entry in sorted(Files.scan_images(class_dir), key=lambda e: e.name)]
+    return samples
+
+
+def load_samples(tasks):
+    """
+    Load and augment a batch of samples, this runs inside a worker process.
+
+    Args:
+        tasks (list[tuple[str, int, int | None]]): List of (image path, label, seed) tuples, the images without
+            a seed are not augmented.
+    Returns:
+        list[tuple[np.ndarray, int]]: The BGR image and label of each sample, the images that cannot be decoded are
+            skipped.
+    """
+    # Import OpenCV here, so listing the samples does not load it
+    import cv2
+
+    samples = []
+    for input_path, label, seed in tasks:
+        image = cv2.imread(input_path)
+        if image is None:
+            print(f"Warning: Could not read {input_path}")
+            continue
+
+        if seed is not None:
+            image = augment_sample(image, seed)
+        samples.append((image, label))
+    return samples
+
+
+def stream_samples(samples, epoch=0, seed=None, shuffle=True, augment=True, workers=None, batch_size=32,
+                   prefetch=2):
+    """
+    Stream the samples of an epoch, loaded and augmented across worker processes.
+
+    Only a few batches per worker are loaded ahead, so the augmented images are never stored on disk nor all kept in
+    memory. The order and the augmentations only depend on the seed and the epoch.
+
+    Args:
+        samples (list[tuple[str, int]]): The image path and label of each sample, e.g. from get_samples.
+        epoch (int): The epoch, each one has its own order and augmentations.
+        seed (int, optional): Seed of the order and the augmentations.
+        shuffle (bool): Shuffle the samples.
+        augment (bool): Augment the images.
+        workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+        batch_size (int): Number of samples per worker batch.
+        prefetch (int): Number of batches loaded ahead per worker.
+    Returns:
+        Iterator[tuple[np.ndarray, int]]: The BGR image and label of each sample.
+    """
+    seed = Files.AUGMENTATION_SEED if seed is None else seed
+
+    # Get the order of the epoch
+    indices = np.arange(len(samples))
+    if shuffle:
+        indices = np.random.default_rng([seed, epoch]).permutation(len(samples))
+
+    tasks = [(*samples[i], get_sample_seed(seed, epoch, i) if augment else None) for i in indices]
+    batches = batch(tasks, batch_size)
+
+    # Load the batches in the current process
+    workers = get_workers(workers)
+    if workers == 1:
+        for b in batches:
+            yield from load_samples(b)
+        return
+
+    # Keep a bounded number of batches in flight, in submission order
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for b in batches:
+            pending.append(executor.submit(load_samples, b))
+            if len(pending) >= workers * prefetch:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
@@ -0,0 +1,113 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from time import perf_counter
+from typing import Callable, Iterator, Optional
+
+
+def get_workers(workers: Optional[int] = None) -> int:
+    """
+    Get the number of workers to use.
+
+    Args:
+        workers (int, optional): Requested number of workers. Defaults to the number of CPUs.
+    Returns:
+        int: The number of workers, at least one.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    return max(1, workers)
+
+
+def batch(items: list, batch_size: int) -> list[list]:
+    """
+    Split a list into batches.
+
+    Args:
+        items (list): List of items to split.
+        batch_size (int): Maximum number of items per batch.
+    Returns:
+        list[list]: List of batches.
+    """
+    batch_size = max(1, batch_size)
+    return [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+
+
+def process_batches(func: Callable[[list], object], items: list, workers: Optional[int] = None,
+                    batch_size: Optional[int] = None) -> Iterator:
+    """
+    Run a function over batches of items in a process pool.
+
+    The items are split into batches so each worker receives many items per task, which amortizes the
+    inter-process communication. If a single worker is requested, the batches run in the current process.
+
+    Args:
+        func (Callable[[list], object]): Picklable function that processes a batch of items.
+        items (list): List of items to process.
+        workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+        batch_size (int, optional): Number of items per batch. Defaults to a size that gives each worker
+            about four batches.
+    Returns:
+        Iterator: The results of each batch, in submission order.
+    """
+    workers = get_workers(workers)
+    if batch_size is None:
+        batch_size = -(-len(items) // (workers * 4))
+    batches = batch(items, batch_size)
+
+    # Run the batches in the current process
+    if workers == 1 or len(batches) <= 1:
+        for b in batches:
+            yield func(b)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(batches))) as executor:
+        yield from executor.map(func, batches)
+
+
+def get_io_workers(workers: Optional[int] = None) -> int:
+    """
+    Get the number of threads to use for I/O-bound work.
+
+    Args:
+        workers (int, optional): Requested number of threads. Defaults to the number of CPUs plus four, up to 32.
+    Returns:
+        int: The number of threads, at least one.
+    """
+    if workers is None:
+        workers = min(32, (os.cpu_count() or 1) + 4)
+    return max(1, workers)
+
+
+def process_threads(func: Callable, items: list, workers: Optional[int] = None, batch_size: int = 1024,
+                    label: str = 'Processed', unit: str = 'files') -> list:
+    """
+    Run an I/O-bound function over items in a thread pool.
+
+    The items are submitted in batches, which bounds the number of pending tasks, and the progress is logged
+    once per batch. The throughput is logged at the end.
+
+    Args:
+        func (Callable): Function applied to each item.
+        items (list): List of items to process.
+        workers (int, optional): Number of threads. Defaults to the number of CPUs plus four, up to 32.
+        batch_size (int): Number of items submitted at once.
+        label (str): Verb used in the logs.
+        unit (str): Name of the items used in the logs.
+    Returns:
+        list: The results of each item, in order.
+    """
+    start_time = perf_counter()
+    workers = get_io_workers(workers)
+
+    results = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for b in batch(items, batch_size):
+            results += executor.map(func, b)
+            print(f"{label} {len(results)}/{len(items)} {unit}")
+
+    # Log the throughput
+    elapsed_time = perf_counter() - start_time
+    throughput = len(results) / elapsed_time if elapsed_time > 0 else 0
+    print(f"{label} {len(results)} {unit} with {workers} threads in {elapsed_time:.2f} seconds "
+          f"({throughput:.2f} {unit}/s)")
+    return results
@@ -0,0 +1,177 @@
+import os
+
+from dataset_pipeline.config import Files
+from dataset_pipeline.files.manifest import Manifest
+from dataset_pipeline.files.zip import Zip
+from dataset_pipeline.runner import Pipeline, Stage
+from dataset_pipeline.split import ARCHIVE, MANIFEST, get_input_dir, split_dataset
+from dataset_pipeline.validate import validate_dataset
+from dataset_pipeline.zip_to_train import zip_to_train
+
+
+def run_resize():
+    """
+    Run the resize stage, OpenCV is only imported when it runs.
+    """
+    from dataset_pipeline.resize import resize_dataset
+    resize_dataset()
+
+
+def run_augment():
+    """
+    Run the augmentation stage, OpenCV is only imported when it runs.
+    """
+    from dataset_pipeline.augment import augment_dataset
+    augment_dataset()
+
+
+def check_stage_outputs(output_dir, manifest_path):
+    """
+    Check that a dataset has exactly the outputs listed in the manifest of the stage that writes it.
+
+    The skipped stages leave their outputs as they are, so a file left by a previous run would be split and zipped
+    as if it was part of the dataset.
+
+    Args:
+        output_dir (str): The dataset written by the stage.
+        manifest_path (str): Path of the manifest of the stage.
+    Raises:
+        ValueError: If the dataset has files that are not listed in the manifest, or the manifest lists files that
+            do not exist.
+    """
+    _, entries = Manifest.read(manifest_path)
+    listed_paths = {os.path.normpath(p) for entry in entries.values() for p in entry['outputs']}
+    existing_paths = {os.path.normpath(entry.path) for entry in Files.scan_dir(output_dir, recursive=True)}
+
+    unlisted_paths = sorted(existing_paths - listed_paths)
+    missing_paths = sorted(listed_paths - existing_paths)
+    if unlisted_paths or missing_paths:
+        examples = ', '.join(os.path.relpath(p, output_dir) for p in (unlisted_paths + missing_paths)[:5])
+        raise ValueError(f"{output_dir} does not match {manifest_path}: {len(unlisted_paths)} files are not "
+                         f"listed and {len(missing_paths)} listed files are missing, e.g. {examples}")
+
+
+def run_split(mode, remove_input):
+    """
+    Run the split stage, after checking its input dataset has exactly the outputs of the previous stage.
+
+    Args:
+        mode (str): The split mode.
+        remove_input (bool): Remove the input dataset after splitting it.
+    """
+    if not Files.ONLINE_AUGMENTATION:
+        check_stage_outputs(Files.DATASET_AUGMENTED, Files.DATASET_AUGMENTED_MANIFEST)
+    elif Files.IMAGE_SIZE is not None:
+        check_stage_outputs(Files.DATASET_RESIZED, Files.DATASET_RESIZED_MANIFEST)
+    split_dataset(mode=mode, remove_input=remove_input)
+
+
+def get_stages(keep_intermediates=None):
+    """
+    Get the stages of the dataset pipeline.
+
+    The resize stage is only included if Files.IMAGE_SIZE is set, otherwise the original images are augmented. The
+    augmentation stage is not included if Files.ONLINE_AUGMENTATION is set, the images are then augmented on the fly
+    while training. The split stage checks its input dataset has exactly the outputs listed in the manifest of the
+    previous stage, so the files left by a previous run are not shipped.
+    The resize and augmentation stages are imported when they run, so declaring the pipeline does not load OpenCV
+    or albumentations.
+
+    Args:
+        keep_intermediates (bool, optional): Keep the resized, augmented and organized datasets, so the unchanged
+            stages are skipped on the next run. Otherwise each stage removes or moves the dataset of the previous
+            one, as when the scripts run by hand.
+    Returns:
+        list[Stage]: The stages of the pipeline.
+    """
+    keep_intermediates = Files.PIPELINE_KEEP_INTERMEDIATES if keep_intermediates is None else keep_intermediates
+
+    # Hardlink the images instead of moving them, so the augmented dataset is kept
+    split_mode = Files.SPLIT_MODE
+    if keep_intermediates and split_mode == Files.MOVE:
+        split_mode = Files.HARDLINK
+
+    zip_path = Files.DATASET_ORGANIZED_ZIP
+    if Files.ZIP_PART_MAX_SIZE is not None:
+        zip_path = Zip.get_parts_index_path(zip_path)
+
+    # The archive mode writes the zip directly, and the manifest mode does not create the organized dataset
+    split_outputs = [Files.DATASET_SPLIT_MANIFEST]
+    if split_mode == ARCHIVE:
+        split_outputs.append(zip_path)
+    elif split_mode != MANIFEST:
+        split_outputs.append(Files.DATASET_ORGANIZED)
+
+    stages = [
+        Stage('validate', validate_dataset,
+              inputs=[Files.DATASET_ORIGINAL],
+              outputs=[Files.DATASET_VALIDATED_MANIFEST],
+              params={'full_decode': Files.VALIDATION_FULL_DECODE}),
+    ]
+
+    # Resize the images before augmenting them
+    augment_inputs = [Files.DATASET_ORIGINAL, Files.DATASET_VALIDATED_MANIFEST]
+    augment_dep = 'validate'
+    if Files.IMAGE_SIZE is not None:
+        stages.append(
+            Stage('resize', run_resize,
+                  inputs=augment_inputs,
+                  outputs=[Files.DATASET_RESIZED],
+                  params={'image_size': Files.IMAGE_SIZE, 'resize_mode': Files.RESIZE_MODE,
+                          'letterbox_pad_value': Files.LETTERBOX_PAD_VALUE,
+                          'reduced_decode_min_ratio': Files.REDUCED_DECODE_MIN_RATIO},
+                  deps=['validate']))
+        augment_inputs = [Files.DATASET_RESIZED]
+        augment_dep = 'resize'
+
+    # Save the augmented images, unless they are augmented on the fly while training
+    split_inputs = [get_input_dir()]
+    split_dep = augment_dep
+    if not Files.ONLINE_AUGMENTATION:
+        stages.append(
+            Stage('augment', run_augment,
+                  inputs=augment_inputs,
+                  outputs=[Files.DATASET_AUGMENTED],
+                  params={'num_augmentations': Files.NUM_AUGMENTATIONS, 'output_format': Files.AUGMENTATION_FORMAT,
+                          'encoder': (Files.JPEG_QUALITY, Files.JPEG_OPTIMIZE, Files.WEBP_QUALITY,
+                                      Files.PNG_COMPRESSION),
+                          'requires_rgb': Files.AUGMENTATION_REQUIRES_RGB},
+                  deps=[augment_dep]))
+        split_inputs += Files.AUGMENTED_MANIFESTS
+        split_dep = 'augment'
+
+    stages.append(
+        Stage('split', lambda: run_split(split_mode, not keep_intermediates),
+              inputs=split_inputs,
+              outputs=split_outputs,
+              params={'mode': split_mode, 'seed': Files.SPLIT_SEED, 'stratify': Files.SPLIT_STRATIFY},
+              deps=[split_dep]))
+
+    # Zip the organized dataset for the training notebook
+    if split_mode in Files.TRANSFER_MODES:
+        stages.append(
+            Stage('zip_to_train',
+                  lambda: zip_to_train(Files.CWD, Files.DATASET_ORGANIZED, Files.DATASET,
+                                       remove_input=not keep_intermediates),
+                  inputs=[Files.DATASET_ORGANIZED],
+                  outputs=[zip_path],
+                  params={'zip_part_max_size': Files.ZIP_PART_MAX_SIZE},
+                  deps=['split']))
+    return stages
+
+
+def run_pipeline(targets=None, force=False, keep_intermediates=None):
+    """
+    Run the dataset pipeline, from the original dataset to the training zip, and print the time of each stage.
+
+    Args:
+        targets (list[str], optional): Names of the stages to run, their dependencies are included. Defaults to all
+            the stages.
+        force (bool): Run the stages even if their inputs and parameters did not change.
+        keep_intermediates (bool, optional): Keep the intermediate datasets, so the unchanged stages are skipped on
+            the next run.
+    Returns:
+        list[dict]: The name, status, elapsed time and number of input and output files of each stage.
+    """
+    pipeline = Pipeline(get_stages(keep_intermediates), Files.DATASET_PIPELINE_STATE)
+    return pipeline.run(targets, force)
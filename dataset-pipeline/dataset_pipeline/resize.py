@@ -0,0 +1,282 @@
+import os
+from time import time
+import cv2
+import numpy as np
+from PIL import Image
+
+from dataset_pipeline.config import Files
+from dataset_pipeline.files.manifest import Manifest
+from dataset_pipeline.parallel import get_workers, process_batches
+from dataset_pipeline.validate import get_image_sizes
+
+# Reduced JPEG decoding flags by scale denominator, from the smallest to the largest output
+REDUCED_IMREAD_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                        (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+# Resize modes
+STRETCH = 'stretch'
+LETTERBOX = 'letterbox'
+CENTER_CROP = 'center_crop'
+SHORTEST_SIDE = 'shortest_side'
+RESIZE_MODES = (STRETCH, LETTERBOX, CENTER_CROP, SHORTEST_SIDE)
+
+# JPEG extensions, only JPEG images can be decoded at a reduced scale in the DCT domain
+JPEG_EXTENSIONS = ('.jpg', '.jpeg')
+
+
+def get_imread_flag(input_path, min_ratio, size=None):
+    """
+    Get the imread flag that decodes an image at the smallest scale still larger than the target size.
+
+    JPEG images can be decoded at 1/2, 1/4 or 1/8 of their resolution, which is much faster and uses less
+    memory than decoding them at full resolution before resizing them.
+
+    Args:
+        input_path (str): Path of the image.
+        min_ratio (float | None): Minimum ratio between the decoded size and the target size, higher
+            values keep more detail for the final resize. None disables the reduced decoding.
+        size (tuple[int, int], optional): Width and height of the image, e.g. from the validation manifest. Read
+            from the image header if not given.
+    Returns:
+        int: The imread flag.
+    """
+    if min_ratio is None or not input_path.lower().endswith(JPEG_EXTENSIONS):
+        return cv2.IMREAD_COLOR
+
+    # Read the image size from its header, without decoding it
+    if size is None:
+        try:
+            with Image.open(input_path) as image:
+                size = image.size
+        except OSError:
+            return cv2.IMREAD_COLOR
+    width, height = size
+
+    # Get the largest reduction that keeps both sides above the minimum size, this is enough for every resize mode
+    min_size = Files.IMAGE_SIZE * min_ratio
+    for scale, flag in REDUCED_IMREAD_FLAGS:
+        if min(width, height) / scale >= min_size:
+            return flag
+    return cv2.IMREAD_COLOR
+
+
+def read_image(input_path, size=None):
+    """
+    Read an image to be resized, decoding it at a reduced scale when possible.
+
+    Args:
+        input_path (str): Path of the image.
+        size (tuple[int, int], optional): Width and height of the image, if known.
+    Returns:
+        np.ndarray | None: The BGR image, None if it cannot be decoded.
+    """
+    return cv2.imread(input_path, get_imread_flag(input_path, Files.REDUCED_DECODE_MIN_RATIO, size))
+
+
+def get_resized_shape(height, width, mode=None, size=None):
+    """
+    Get the shape of an image after resizing it.
+
+    Args:
+        height (int): Height of the image.
+        width (int): Width of the image.
+        mode (str, optional): Resize mode, one of RESIZE_MODES.
+        size (int, optional): Target size.
+    Returns:
+        tuple[int, int]: The height and width of the resized image.
+    """
+    mode = Files.RESIZE_MODE if mode is None else mode
+    size = Files.IMAGE_SIZE if size is None else size
+
+    if mode == SHORTEST_SIDE:
+        scale = size / min(height, width)
+        return max(1, round(height * scale)), max(1, round(width * scale))
+    if mode in RESIZE_MODES:
+        return size, size
+    raise ValueError(f"Invalid resize mode: {mode}, expected one of {RESIZE_MODES}")
+
+
+def resize(image, mode=None, size=None, dst=None):
+    """
+    Resize an image in memory.
+
+    Args:
+        image (np.ndarray): The image to resize.
+        mode (str, optional): Resize mode, one of RESIZE_MODES:
+            - stretch: resize to a square, without keeping the aspect ratio.
+            - letterbox: fit the longest side to the size and pad the shortest side.
+            - center_crop: fit the shortest side to the size and crop the center of the longest side.
+            - shortest_side: fit the shortest side to the size, keeping the aspect ratio.
+        size (int, optional): Target size.
+        dst (np.ndarray, optional): Array to write the resized image into, it must have the resized shape.
+    Returns:
+        np.ndarray: The resized image.
+    """
+    mode = Files.RESIZE_MODE if mode is None else mode
+    size = Files.IMAGE_SIZE if size is None else size
+
+    height, width = image.shape[:2]
+    resized_height, resized_width = get_resized_shape(height, width, mode, size)
+
+    if mode == LETTERBOX:
+        if dst is None:
+            dst = np.empty((resized_height, resized_width, *image.shape[2:]), dtype=image.dtype)
+
+        # Resize the image into the center of the padded image
+        scale = size / max(height, width)
+        fit_height, fit_width = max(1, round(height * scale)), max(1, round(width * scale))
+        top, left = (size - fit_height) // 2, (size - fit_width) // 2
+        dst[:top] = Files.LETTERBOX_PAD_VALUE
+        dst[top + fit_height:] = Files.LETTERBOX_PAD_VALUE
+        dst[top:top + fit_height, :left] = Files.LETTERBOX_PAD_VALUE
+        dst[top:top + fit_height, left + fit_width:] = Files.LETTERBOX_PAD_VALUE
+        cv2.resize(image, (fit_width, fit_height), dst=dst[top:top + fit_height, left:left + fit_width])
+        return dst
+
+    if mode == CENTER_CROP:
+        # Crop the center square before resizing it, the crop is a view so the image is not copied
+        side = min(height, width)
+        top, left = (height - side) // 2, (width - side) // 2
+        image = image[top:top + side, left:left + side]
+
+    return cv2.resize(image, (resized_width, resized_height), dst=dst)
+
+
+def resize_batch(images, mode=None, size=None):
+    """
+    Resize a batch of images into a single contiguous array.
+
+    Each image is resized directly into its slot of the batch, so no intermediate arrays are allocated.
+
+    Args:
+        images (list[np.ndarray]): The images to resize, with the same number of channels.
+        mode (str, optional): Resize mode, one of RESIZE_MODES.
+        size (int, optional): Target size.
+    Returns:
+        np.ndarray: The (N, H, W, C) uint8 batch of resized images.
+    """
+    mode = Files.RESIZE_MODE if mode is None else mode
+    size = Files.IMAGE_SIZE if size is None else size
+
+    if not images:
+        return np.empty((0, size, size, 3), dtype=np.uint8)
+
+    # Get the shape of the batch, every resized image must have the same shape
+    shapes = {get_resized_shape(*image.shape[:2], mode, size) for image in images}
+    if len(shapes) > 1:
+        raise ValueError(f"Images resized with the {mode} mode have different shapes {shapes}, "
+                         "they cannot be stacked")
+    resized_height, resized_width = shapes.pop()
+
+    batch = np.empty((len(images), resized_height, resized_width, *images[0].shape[2:]), dtype=np.uint8)
+    for i, image in enumerate(images):
+        resize(image, mode, size, dst=batch[i])
+    return batch
+
+
+def resize_image(input_path, output_dir, image_filename, size=None):
+    """
+    Resize images.
+    """
+    # Read the image, it is kept in BGR since resizing does not depend on the channel order
+    image = read_image(input_path, size)
+    if image is None:
+        print(f"Warning: Could not read {input_path}, run validate.py to quarantine it")
+        return None
+
+    # Resize the image
+    image = resize(image)
+
+    # Save the image
+    output_path = os.path.join(output_dir, image_filename)
+    cv2.imwrite(output_path, image)
+
+    return output_path
+
+
+def resize_images(tasks):
+    """
+    Resize a batch of images, this runs inside a worker process.
+
+    Args:
+        tasks (list[tuple[str, str, str, tuple[int, int] | None]]): List of (input path, output directory, image
+            filename, image size) tuples.
+    Returns:
+        list[dict]: The manifest entries of the resized images, the images that cannot be read are skipped.
+    """
+    entries = []
+    for input_path, output_dir, image_filename, size in tasks:
+        output_path = resize_image(input_path, output_dir, image_filename, size)
+        if output_path is not None:
+            entries.append(Manifest.create_entry(input_path, [output_path]))
+    return entries
+
+
+def resize_dataset(workers=None, batch_size=None, incremental=True):
+    """
+    Resize a dataset.
+
+    Args:
+        workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+        batch_size (int, optional): Number of images per worker batch.
+        incremental (bool): Skip the images that were already resized with the same parameters.
+    """
+    workers = Files.NUM_WORKERS if workers is None else workers
+    batch_size = Files.BATCH_SIZE if batch_size is None else batch_size
+
+    # Get current time
+    start_time = time()
+
+    # Check if the dataset directories exist, if not it creates them
+    for io_dir in [Files.DATASET_ORIGINAL, Files.DATASET_RESIZED]:
+        os.makedirs(io_dir, exist_ok=True)
+
+    # Load the manifest of the previous runs
+    manifest = Manifest(Files.DATASET_RESIZED_MANIFEST,
+                        {'image_size': Files.IMAGE_SIZE, 'resize_mode': Files.RESIZE_MODE,
+                         'letterbox_pad_value': Files.LETTERBOX_PAD_VALUE,
+                         'reduced_decode_min_ratio': Files.REDUCED_DECODE_MIN_RATIO})
+
+    # Get the image sizes recorded by the validation stage
+    sizes = get_image_sizes()
+
+    tasks = []
+    sources = []
+    for _, model_class in enumerate(Files.MODEL_CLASSES):
+        # Get the input and output directories
+        input_dir = os.path.join(Files.DATASET_ORIGINAL, model_class)
+        output_dir = os.path.join(Files.DATASET_RESIZED, model_class)
+
+        # Ensure the input and output directories exist
+        for io_dir in [input_dir, output_dir]:
+            os.makedirs(io_dir, exist_ok=True)
+
+        # Get the image files, and the files that were already resized
+        image_filenames = [entry.name for entry in Files.scan_images(input_dir)]
+        existing_paths = {entry.path for entry in Files.scan_dir(output_dir)}
+
+        # Queue each image that was not resized yet
+        for image_filename in image_filenames:
+            input_image_path = os.path.join(input_dir, image_filename)
+            sources.append(input_image_path)
+            if not incremental or not manifest.is_processed(input_image_path, existing_paths):
+                tasks.append((input_image_path, output_dir, image_filename, sizes.get(input_image_path)))
+
+    if len(tasks) < len(sources):
+        print(f"Skipping {len(sources) - len(tasks)} images already resized")
+
+    # Resize the images across the worker processes
+    workers = get_workers(workers)
+    resized = 0
+    for entries in process_batches(resize_images, tasks, workers, batch_size):
+        manifest.add(entries)
+        resized += len(entries)
+        print(f"Resized {resized}/{len(tasks)} images")
+
+    # Remove the entries and outputs of the images that no longer exist
+    manifest.save(sources)
+
+    # Log the throughput
+    elapsed_time = time() - start_time
+    throughput = resized / elapsed_time if elapsed_time > 0 else 0
+    print(f"Resized {resized} images with {workers} workers in {elapsed_time:.2f} seconds ({throughput:.2f} images/s)")
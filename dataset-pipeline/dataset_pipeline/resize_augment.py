@@ -0,0 +1,131 @@
+import os
+from time import time
+
+from dataset_pipeline.config import Files
+from dataset_pipeline.files.manifest import Manifest
+from dataset_pipeline.parallel import get_workers, process_batches
+from dataset_pipeline.resize import read_image, resize
+from dataset_pipeline.augment import (augment, create_encode_stats, get_encoder_params, merge_encode_stats,
+                                      print_encode_report)
+from dataset_pipeline.validate import get_image_sizes
+
+
+def resize_augment_image(input_path, output_dir, image_filename, num_augmentations,
+                         output_format=None, stats=None, size=None):
+    """
+    Resize and augment images, decoding each image once and never saving the resized image.
+    """
+    output_format = Files.AUGMENTATION_FORMAT if output_format is None else output_format
+
+    # Read the image
+    image = read_image(input_path, size)
+    if image is None:
+        print(f"Warning: Could not read {input_path}, run validate.py to quarantine it")
+        return []
+
+    # Resize the image in memory and save its augmentations
+    return augment(resize(image), output_dir, image_filename, num_augmentations, output_format, stats)
+
+
+def resize_augment_images(tasks):
+    """
+    Resize and augment a batch of images, this runs inside a worker process.
+
+    Args:
+        tasks (list[tuple[str, str, str, int, str, tuple[int, int] | None]]): List of (input path, output
+            directory, image filename, number of augmentations, output format, image size) tuples.
+    Returns:
+        tuple[list[dict], dict]: The manifest entries of the processed images and the encoding statistics, the
+            images that cannot be read are skipped.
+    """
+    entries = []
+    stats = create_encode_stats()
+    for input_path, output_dir, image_filename, num_augmentations, output_format, size in tasks:
+        output_paths = resize_augment_image(input_path, output_dir, image_filename, num_augmentations,
+                                            output_format, stats, size)
+        if output_paths:
+            entries.append(Manifest.create_entry(input_path, output_paths))
+    return entries, stats
+
+
+def resize_augment_dataset(num_augmentations=None, workers=None,
+                           batch_size=None, incremental=True, output_format=None):
+    """
+    Resize and augment a dataset in a single pass, from the original dataset to the augmented dataset.
+
+    Args:
+        num_augmentations (int, optional): Number of augmented images generated per image.
+        workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+        batch_size (int, optional): Number of images per worker batch.
+        incremental (bool): Skip the images that were already processed with the same parameters.
+        output_format (str, optional): Output format of the augmented images, one of OUTPUT_FORMATS.
+    """
+    num_augmentations = Files.NUM_AUGMENTATIONS if num_augmentations is None else num_augmentations
+    workers = Files.NUM_WORKERS if workers is None else workers
+    batch_size = Files.BATCH_SIZE if batch_size is None else batch_size
+    output_format = Files.AUGMENTATION_FORMAT if output_format is None else output_format
+
+    # Get current time
+    start_time = time()
+
+    # Check if the dataset directories exist, if not it creates them
+    for io_dir in [Files.DATASET_ORIGINAL, Files.DATASET_AUGMENTED]:
+        os.makedirs(io_dir, exist_ok=True)
+
+    # Load the manifest of the previous runs
+    manifest = Manifest(Files.DATASET_RESIZED_AUGMENTED_MANIFEST,
+                        {'image_size': Files.IMAGE_SIZE, 'resize_mode': Files.RESIZE_MODE,
+                         'letterbox_pad_value': Files.LETTERBOX_PAD_VALUE,
+                         'num_augmentations': num_augmentations, 'output_format': output_format,
+                         'encoder_params': get_encoder_params(output_format),
+                         'reduced_decode_min_ratio': Files.REDUCED_DECODE_MIN_RATIO,
+                         'requires_rgb': Files.AUGMENTATION_REQUIRES_RGB})
+
+    # Get the image sizes recorded by the validation stage
+    sizes = get_image_sizes()
+
+    tasks = []
+    sources = []
+    for _, model_class in enumerate(Files.MODEL_CLASSES):
+        # Get the input and output directories
+        input_dir = os.path.join(Files.DATASET_ORIGINAL, model_class)
+        output_dir = os.path.join(Files.DATASET_AUGMENTED, model_class)
+
+        # Ensure the input and output directories exist
+        for io_dir in [input_dir, output_dir]:
+            os.makedirs(io_dir, exist_ok=True)
+
+        # Get the image files, and the files that were already augmented
+        image_filenames = [entry.name for entry in Files.scan_images(input_dir)]
+        existing_paths = {entry.path for entry in Files.scan_dir(output_dir)}
+
+        # Queue each image that was not processed yet
+        for image_filename in image_filenames:
+            input_image_path = os.path.join(input_dir, image_filename)
+            sources.append(input_image_path)
+            if not incremental or not manifest.is_processed(input_image_path, existing_paths):
+                tasks.append((input_image_path, output_dir, image_filename, num_augmentations, output_format,
+                              sizes.get(input_image_path)))
+
+    if len(tasks) < len(sources):
+        print(f"Skipping {len(sources) - len(tasks)} images already resized and augmented")
+
+    # Resize and augment the images across the worker processes
+    workers = get_workers(workers)
+    processed = 0
+    stats = create_encode_stats()
+    for entries, batch_stats in process_batches(resize_augment_images, tasks, workers, batch_size):
+        manifest.add(entries)
+        merge_encode_stats(stats, batch_stats)
+        processed += len(entries)
+        print(f"Resized and augmented {processed}/{len(tasks)} images")
+
+    # Remove the entries and outputs of the images that no longer exist
+    manifest.save(sources)
+
+    # Log the throughput
+    elapsed_time = time() - start_time
+    throughput = processed / elapsed_time if elapsed_time > 0 else 0
+    print(f"Resized and augmented {processed} images into {processed * num_augmentations} images with {workers} "
+          f"workers in {elapsed_time:.2f} seconds ({throughput:.2f} images/s)")
+    print_encode_report(stats, output_format)
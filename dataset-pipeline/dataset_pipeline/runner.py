@@ -0,0 +1,231 @@
+import hashlib
+import json
+import os
+from time import perf_counter
+from typing import Callable, Iterable, Optional
+
+from dataset_pipeline.files import Files
+
+
+class Stage:
+    """
+    Stage of a pipeline, with the paths it reads and writes and the parameters its outputs depend on.
+    """
+
+    def __init__(self, name: str, func: Callable[[], object], inputs: Iterable[str] = (), outputs: Iterable[str] = (),
+                 params: Optional[dict] = None, deps: Iterable[str] = ()):
+        """
+        Declare a stage.
+
+        Args:
+            name (str): Unique name of the stage.
+            func (Callable[[], object]): Function that runs the stage.
+            inputs (Iterable[str]): Files and folders read by the stage.
+            outputs (Iterable[str]): Files and folders written by the stage.
+            params (dict, optional): JSON-serializable parameters of the stage, a change reruns the stage.
+            deps (Iterable[str]): Names of the stages that must run before this one.
+        """
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.params = params or {}
+        self.deps = tuple(deps)
+
+
+class Pipeline:
+    """
+    Runner of a DAG of stages, which skips the stages whose inputs, outputs and parameters did not change.
+
+    The fingerprint of a path is computed from the relative path, size and mtime of its files, without reading
+    them. The fingerprints of each stage are recorded in a JSON state file after it runs, so an interrupted
+    pipeline resumes from the first stage that did not finish.
+    """
+
+    def __init__(self, stages: Iterable[Stage], state_path: str):
+        """
+        Check the stages form a DAG.
+
+        Args:
+            stages (Iterable[Stage]): Stages of the pipeline.
+            state_path (str): Path of the state file.
+        Raises:
+            ValueError: If a stage name is duplicated, a dependency does not exist or the dependencies have a cycle.
+        """
+        self.stages = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicated stage: {stage.name}")
+            self.stages[stage.name] = stage
+
+        for stage in self.stages.values():
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage {stage.name} depends on an unknown stage: {dep}")
+
+        self.state_path = state_path
+        self.order = self.sort(self.stages.keys())
+
+    def sort(self, targets: Iterable[str]) -> list[Stage]:
+        """
+        Sort the stages topologically.
+
+        Args:
+            targets (Iterable[str]): Names of the stages to run, their dependencies are included.
+        Returns:
+            list[Stage]: The stages, each one after its dependencies.
+        Raises:
+            ValueError: If a stage does not exist or the dependencies have a cycle.
+        """
+        order = []
+        visited = set()
+        visiting = set()
+
+        def visit(name, path):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"Cycle between the stages: {' -> '.join(path + [name])}")
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage: {name}")
+
+            visiting.add(name)
+            for dep in self.stages[name].deps:
+                visit(dep, path + [name])
+            visiting.remove(name)
+            visited.add(name)
+            order.append(self.stages[name])
+
+        for target in targets:
+            visit(target, [])
+        return order
+
+    @staticmethod
+    def fingerprint(paths: Iterable[str]) -> tuple[str, int]:
+        """
+        Compute the fingerprint of files and folders from the metadata of their files.
+
+        Args:
+            paths (Iterable[str]): Paths of the files and folders, missing paths are fingerprinted as missing.
+        Returns:
+            tuple[str, int]: The SHA-1 hex digest and the number of files.
+        """
+        digest = hashlib.sha1()
+        count = 0
+        for path in paths:
+            digest.update(f'{os.path.basename(path)}\0'.encode())
+            if os.path.isdir(path):
+                files = []
+                for entry in Files.scan_dir(path, recursive=True):
+                    stat = entry.stat()
+                    files.append((os.path.relpath(entry.path, path).replace(os.sep, '/'), stat.st_size,
+                                  stat.st_mtime_ns))
+                files.sort()
+            elif os.path.isfile(path):
+                stat = os.stat(path)
+                files = [('', stat.st_size, stat.st_mtime_ns)]
+            else:
+                digest.update(b'missing\n')
+                continue
+
+            for rel_path, size, mtime in files:
+                digest.update(f'{rel_path}\0{size}\0{mtime}\n'.encode())
+            count += len(files)
+        return digest.hexdigest(), count
+
+    def load_state(self) -> dict[str, dict]:
+        """
+        Load the state of the previous runs.
+
+        Returns:
+            dict[str, dict]: The parameters and fingerprints of each stage that finished.
+        """
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path, 'r') as f:
+            return json.load(f)
+
+    def save_state(self, state: dict[str, dict]) -> None:
+        """
+        Save the state atomically, so an interrupted write does not corrupt it.
+
+        Args:
+            state (dict[str, dict]): The parameters and fingerprints of each stage that finished.
+        """
+        Files.ensure_directory_exists(self.state_path)
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def run(self, targets: Optional[Iterable[str]] = None, force: bool = False) -> list[dict]:
+        """
+        Run the stages in dependency order.
+
+        A stage is skipped if its parameters and the fingerprints of its inputs and outputs match the last time it
+        ran, and none of its dependencies ran.
+
+        Args:
+            targets (Iterable[str], optional): Names of the stages to run, their dependencies are included. Defaults
+                to all the stages.
+            force (bool): Run the stages even if they did not change.
+        Returns:
+            list[dict]: The name, status, elapsed time and number of input and output files of each stage.
+        """
+        stages = self.order if targets is None else self.sort(targets)
+        state = self.load_state()
+
+        ran = set()
+        results = []
+        for stage in stages:
+            # Check if the stage changed since it last ran
+            start_time = perf_counter()
+            params = json.loads(json.dumps(stage.params, default=str))
+            inputs_digest, num_inputs = self.fingerprint(stage.inputs)
+            outputs_digest, num_outputs = self.fingerprint(stage.outputs)
+            previous = state.get(stage.name)
+            unchanged = (previous is not None and previous['params'] == params
+                         and previous['inputs'] == inputs_digest and previous['outputs'] == outputs_digest)
+
+            if not force and unchanged and not ran.intersection(stage.deps):
+                status = 'skipped'
+                print(f"Skipping the {stage.name} stage, its inputs and parameters did not change")
+            else:
+                status = 'ran'
+                print(f"Running the {stage.name} stage")
+                stage.func()
+                ran.add(stage.name)
+
+                # Record the fingerprints after the run, since a stage may move or remove its inputs
+                inputs_digest, _ = self.fingerprint(stage.inputs)
+                outputs_digest, num_outputs = self.fingerprint(stage.outputs)
+                state[stage.name] = {'params': params, 'inputs': inputs_digest, 'outputs': outputs_digest}
+                self.save_state(state)
+
+            results.append({'stage': stage.name, 'status': status, 'elapsed_time': perf_counter() - start_time,
+                            'inputs': num_inputs, 'outputs': num_outputs})
+
+        self.print_report(results)
+        return results
+
+    @staticmethod
+    def print_report(results: list[dict]) -> None:
+        """
+        Print the wall time and throughput of each stage as a table, the throughput is in input files per second.
+
+        Args:
+            results (list[dict]): The results returned by run.
+        """
+        rows = [('Stage', 'Status', 'Time (s)', 'Inputs', 'Outputs', 'Inputs/s')]
+        for result in results:
+            elapsed_time = result['elapsed_time']
+            throughput = result['inputs'] / elapsed_time if result['status'] == 'ran' and elapsed_time > 0 else None
+            rows.append((result['stage'], result['status'], f'{elapsed_time:.2f}', str(result['inputs']),
+                         str(result['outputs']), '' if throughput is None else f'{throughput:.2f}'))
+        rows.append(('total', '', f"{sum(r['elapsed_time'] for r in results):.2f}", '', '', ''))
+
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        for i, row in enumerate(rows):
+            print('  '.join(cell.ljust(w) if j < 2 else cell.rjust(w) for j, (cell, w) in enumerate(zip(row, widths))))
+            if i == 0:
+                print('  '.join('-' * w for w in widths))
@@ -0,0 +1,72 @@
+import os
+import random
+from time import time
+
+from dataset_pipeline.config import Files
+from dataset_pipeline.files.shard import ShardReader, ShardWriter
+
+
+def shard_dataset(input_dir=None, output_dir=None,
+                  max_size=None, seed=None):
+    """
+    Pack a dataset into tar shards, each sample holds the image and its class label.
+
+    Args:
+        input_dir (str, optional): Directory of the dataset, with one subdirectory per class.
+        output_dir (str, optional): Directory where the shards and their index are written.
+        max_size (int, optional): Maximum size in bytes of each shard.
+        seed (int, optional): Seed used to shuffle the samples across the shards, they are not shuffled if None.
+    """
+    input_dir = Files.DATASET_AUGMENTED if input_dir is None else input_dir
+    output_dir = Files.DATASET_SHARDS if output_dir is None else output_dir
+    max_size = Files.SHARD_MAX_SIZE if max_size is None else max_size
+
+    # Get current time
+    start_time = time()
+
+    # Get the images of each class
+    samples = []
+    for _, model_class in enumerate(Files.MODEL_CLASSES):
+        class_dir = os.path.join(input_dir, model_class)
+        if not os.path.exists(class_dir):
+            print(f"Warning: No images found in {class_dir}")
+            continue
+
+        for entry in Files.scan_dir(class_dir):
+            samples.append((model_class, entry.name))
+
+    # Shuffle the samples, so each shard holds a mix of classes
+    if seed is not None:
+        random.Random(seed).shuffle(samples)
+
+    # Write the samples, the image keeps its extension as field name so readers know how to decode it, and in the
+    # key so the images with the same name and different formats (e.g. 'img.jpg' and 'img.png') are distinct samples
+    with ShardWriter(output_dir, max_size) as writer:
+        for model_class, image_filename in samples:
+            stem, ext = os.path.splitext(image_filename)
+            writer.write(f'{model_class}/{stem}_{ext[1:]}', {
+                ext[1:].lower(): os.path.join(input_dir, model_class, image_filename),
+                'cls': str(Files.MODEL_CLASSES.index(model_class)).encode(),
+            })
+
+    # Log
+    elapsed_time = time() - start_time
+    print(f"Packed {len(samples)} images into {len(writer.shards)} shards in {output_dir} "
+          f"in {elapsed_time:.2f} seconds, removed {len(writer.removed_shards)} stale shards")
+
+
+def read_shards(input_dir=None):
+    """
+    Stream the samples of a sharded dataset.
+
+    Args:
+        input_dir (str, optional): Directory of the shards.
+    Returns:
+        Iterator[tuple[str, str, str, bytes]]: The key, class, image extension and encoded image of each sample.
+    """
+    input_dir = Files.DATASET_SHARDS if input_dir is None else input_dir
+
+    for key, fields in ShardReader(input_dir):
+        label = Files.MODEL_CLASSES[int(fields.pop('cls'))]
+        ext, data = fields.popitem()
+        yield key, label, ext, data
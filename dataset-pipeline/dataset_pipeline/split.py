@@ -0,0 +1,357 @@
+import csv
+import hashlib
+import os
+import re
+from shutil import rmtree
+from zipfile import ZipFile, ZIP_DEFLATED
+import numpy as np
+
+from dataset_pipeline.config import Files
+from dataset_pipeline.files.manifest import Manifest
+from dataset_pipeline.files.zip import Zip
+from dataset_pipeline.parallel import process_threads
+
+# Split names
+TRAIN = 'train'
+VAL = 'val'
+TEST = 'test'
+SPLITS = (TRAIN, VAL, TEST)
+
+# Suffix added by the augmentation to the stem of the source image, with its extension and the augmentation index
+AUGMENTATION_SUFFIX_REGEX = re.compile(r'(?:_(?P<ext>[^_.]+))?_\d+$')
+
+# Split mode that only writes the split manifest, without transferring the images
+MANIFEST = 'manifest'
+
+# Split mode that writes the organized dataset directly into the zip uploaded for training
+ARCHIVE = 'zip'
+
+
+def get_hash_value(key, seed=None):
+    """
+    Map a key to a uniform value in [0, 1) with a seeded hash.
+
+    Args:
+        key (str): The key to hash.
+        seed (int, optional): Seed of the hash.
+    Returns:
+        float: The hash value.
+    """
+    seed = Files.SPLIT_SEED if seed is None else seed
+
+    digest = hashlib.blake2b(f'{seed}:{key}'.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') / 2 ** 64
+
+
+def get_lineage(manifest_paths=None):
+    """
+    Get the source image of each augmented image from the augmentation manifests.
+
+    Args:
+        manifest_paths (tuple[str], optional): Paths of the manifests of the stages that write the augmented dataset.
+    Returns:
+        dict[str, str]: The filename of the source image by normalized augmented image path.
+    """
+    manifest_paths = Files.AUGMENTED_MANIFESTS if manifest_paths is None else manifest_paths
+
+    lineage = {}
+    for manifest_path in manifest_paths:
+        _, entries = Manifest.read(manifest_path)
+        for source, entry in entries.items():
+            for output_path in entry['outputs']:
+                lineage[os.path.normpath(output_path)] = os.path.basename(source)
+    return lineage
+
+
+def get_group(image_path, lineage):
+    """
+    Get the group of an image, all the augmentations of a source image belong to the same group.
+
+    The group is the filename of the source image, it does not depend on where the dataset is, so a seed gives the
+    same split in every checkout.
+
+    Args:
+        image_path (str): Path of the image.
+        lineage (dict[str, str]): The source image filename by augmented image path.
+    Returns:
+        str: The source image filename if it is recorded in the lineage, otherwise the filename rebuilt from the
+            augmentation suffix (e.g. 'img_jpg_3.jpg' belongs to 'img.jpg').
+    """
+    source = lineage.get(os.path.normpath(image_path))
+    if source is not None:
+        return source
+
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+    match = AUGMENTATION_SUFFIX_REGEX.search(stem)
+    if match is None:
+        return os.path.basename(image_path)
+    return stem[:match.start()] + (f".{match['ext']}" if match['ext'] else '')
+
+
+def assign_splits(labels, groups, train_ratio=0.7, val_ratio=0.2, seed=None, stratify=None):
+    """
+    Assign a split to each image, assigning whole groups and stratifying them by class.
+
+    Each group gets a seeded hash value. Without stratification the value is compared against the ratios, so
+    the assignment of a group never depends on the other groups. With stratification the groups of each class
+    are ranked by their value and cut at the ratios, so every class is split with the exact ratios, but new
+    groups may move the groups at the boundaries.
+
+    Args:
+        labels (list[int]): Class index of each image.
+        groups (list[str]): Group of each image, groups are considered per class.
+        train_ratio (float): Ratio of the groups used for training.
+        val_ratio (float): Ratio of the groups used for validation, the rest is used for testing.
+        seed (int, optional): Seed of the assignment.
+        stratify (bool, optional): Split the groups of each class with the exact ratios.
+    Returns:
+        np.ndarray: The split index of each image, into SPLITS.
+    """
+    seed = Files.SPLIT_SEED if seed is None else seed
+    stratify = Files.SPLIT_STRATIFY if stratify is None else stratify
+
+    labels = np.asarray(labels, dtype=np.int64)
+    if len(labels) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    # Get the groups per class, and the class of each group
+    keys = np.char.add(np.char.add(labels.astype(str), '/'), np.asarray(groups, dtype=str))
+    unique_keys, first_indices, group_ids = np.unique(keys, return_index=True, return_inverse=True)
+    group_labels = labels[first_indices]
+    values = np.fromiter((get_hash_value(key, seed) for key in unique_keys), dtype=np.float64, count=len(unique_keys))
+
+    if stratify:
+        # Rank the groups of each class by their value, and use their rank within the class as value
+        order = np.lexsort((values, group_labels))
+        sorted_labels = group_labels[order]
+        class_starts = np.searchsorted(sorted_labels, sorted_labels, side='left')
+        class_counts = np.bincount(group_labels)[sorted_labels]
+        values = np.empty_like(values)
+        values[order] = (np.arange(len(order)) - class_starts + 0.5) / class_counts
+
+    group_splits = np.where(values < train_ratio, 0, np.where(values < train_ratio + val_ratio, 1, 2))
+    return group_splits[group_ids.reshape(-1)]
+
+
+def write_split_manifest(rows, manifest_path=None):
+    """
+    Write the split manifest.
+
+    Args:
+        rows (list[tuple[str, str, str]]): List of (image path, class, split) tuples, the paths are stored
+            relative to the manifest directory.
+        manifest_path (str, optional): Path of the manifest.
+    """
+    manifest_path = Files.DATASET_SPLIT_MANIFEST if manifest_path is None else manifest_path
+
+    manifest_dir = os.path.dirname(manifest_path)
+    Files.ensure_directory_exists(manifest_dir)
+
+    with open(manifest_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(('path', 'class', 'split'))
+        for image_path, model_class, split in rows:
+            writer.writerow((os.path.relpath(image_path, manifest_dir).replace(os.sep, '/'), model_class, split))
+
+
+def read_split_manifest(split=None, manifest_path=None):
+    """
+    Read the split manifest.
+
+    Args:
+        split (str, optional): Split to read, one of TRAIN, VAL or TEST. Defaults to all the splits.
+        manifest_path (str, optional): Path of the manifest.
+    Returns:
+        list[tuple[str, str, str]]: List of (image path, class, split) tuples.
+    """
+    manifest_path = Files.DATASET_SPLIT_MANIFEST if manifest_path is None else manifest_path
+
+    manifest_dir = os.path.dirname(manifest_path)
+    with open(manifest_path, 'r', newline='') as f:
+        return [(os.path.join(manifest_dir, row['path']), row['class'], row['split']) for row in csv.DictReader(f)
+                if split is None or row['split'] == split]
+
+
+def remove_stale_images(output_base_dirs, rows):
+    """
+    Remove the images of the organized dataset that are not in the new split, e.g. left by a previous run.
+
+    Args:
+        output_base_dirs (dict[str, str]): The directory of each split.
+        rows (list[tuple[str, str, str]]): List of (output image path, class, split) tuples of the new split.
+    Returns:
+        int: The number of removed images.
+    """
+    output_paths = {os.path.normpath(output_path) for output_path, _, _ in rows}
+
+    stale_paths = [entry.path for output_dir in output_base_dirs.values() if os.path.exists(output_dir)
+                   for entry in Files.scan_dir(output_dir, recursive=True)
+                   if os.path.normpath(entry.path) not in output_paths]
+    for stale_path in stale_paths:
+        os.remove(stale_path)
+    return len(stale_paths)
+
+
+def check_organized_dataset(output_base_dirs):
+    """
+    Check that no image of the organized dataset is in more than one split.
+
+    Args:
+        output_base_dirs (dict[str, str]): The directory of each split.
+    Raises:
+        ValueError: If an image is in more than one split.
+    """
+    splits_by_image = {}
+    for split, output_dir in output_base_dirs.items():
+        if not os.path.exists(output_dir):
+            continue
+        for entry in Files.scan_dir(output_dir, recursive=True):
+            splits_by_image.setdefault(os.path.relpath(entry.path, output_dir), []).append(split)
+
+    leaked_images = {image: splits for image, splits in splits_by_image.items() if len(splits) > 1}
+    if leaked_images:
+        examples = ', '.join(f'{image} ({", ".join(splits)})' for image, splits in list(leaked_images.items())[:5])
+        raise ValueError(f"{len(leaked_images)} images are in more than one split: {examples}")
+
+
+def get_input_dir():
+    """
+    Get the dataset read by the split stage.
+
+    Returns:
+        str: The augmented dataset, or the dataset augmented on the fly while training if
+            Files.ONLINE_AUGMENTATION is set, which is the resized dataset if Files.IMAGE_SIZE is set.
+    """
+    if not Files.ONLINE_AUGMENTATION:
+        return Files.DATASET_AUGMENTED
+    return Files.DATASET_ORIGINAL if Files.IMAGE_SIZE is None else Files.DATASET_RESIZED
+
+
+def split_dataset(train_ratio=0.7,
+                  val_ratio=0.2,
+                  mode=None,
+                  remove_input=True,
+                  seed=None,
+                  stratify=None,
+                  workers=None,
+                  input_dir=None):
+    """
+    Split the dataset into training, validation, and testing sets.
+
+    All the augmentations of a source image are assigned to the same split, so they do not leak between
+    the training and evaluation sets. The assignment is recorded in the split manifest. The original dataset is
+    never moved nor removed, it is hardlinked instead. The images of the organized dataset that are not in the new
+    split are removed, so a rerun never leaves an image in two splits.
+
+    Args:
+        train_ratio (float): Ratio of the source images used for training.
+        val_ratio (float): Ratio of the source images used for validation, the rest is used for testing.
+        mode (str, optional): How the images are transferred, one of Files.TRANSFER_MODES, MANIFEST or ARCHIVE. Moving
+            and linking are metadata-only operations, unsupported modes fall back to copying. The manifest mode
+            only writes the manifest, which points to the input dataset. The archive mode writes the
+            organized layout into Files.DATASET_ORGANIZED_ZIP, or into its parts if Files.ZIP_PART_MAX_SIZE is
+            set, without creating the organized dataset.
+        remove_input (bool): Remove the input dataset after splitting it. Keep it with the hardlink or
+            reflink modes to rerun the augmentation incrementally.
+        seed (int, optional): Seed of the split assignment.
+        stratify (bool, optional): Split the source images of each class with the exact ratios. New images may then
+            move older images to another split, so it is disabled by default.
+        workers (int, optional): Number of threads transferring the images concurrently.
+        input_dir (str, optional): Dataset to split. Defaults to the one returned by get_input_dir.
+    """
+    mode = Files.SPLIT_MODE if mode is None else mode
+    seed = Files.SPLIT_SEED if seed is None else seed
+    stratify = Files.SPLIT_STRATIFY if stratify is None else stratify
+    workers = Files.IO_WORKERS if workers is None else workers
+    input_base_dir = get_input_dir() if input_dir is None else input_dir
+
+    # Keep the original dataset
+    if os.path.normpath(input_base_dir) == os.path.normpath(Files.DATASET_ORIGINAL):
+        if mode == Files.MOVE:
+            mode = Files.HARDLINK
+        remove_input = False
+
+    output_base_dirs = {
+        TRAIN: Files.DATASET_ORGANIZED_TRAINING,
+        VAL: Files.DATASET_ORGANIZED_VALIDATIONS,
+        TEST: Files.DATASET_ORGANIZED_TESTING,
+    }
+
+    # Get the images of every class
+    labels = []
+    image_paths = []
+    for label, model_class in enumerate(Files.MODEL_CLASSES):
+        # Get the input and output directories
+        input_dir = os.path.join(input_base_dir, model_class)
+
+        # Ensure the input and output directories exist
+        os.makedirs(input_dir, exist_ok=True)
+        if mode not in (MANIFEST, ARCHIVE):
+            for output_dir in output_base_dirs.values():
+                os.makedirs(os.path.join(output_dir, model_class), exist_ok=True)
+
+        # Get the list of files
+        image_filenames = [entry.name for entry in Files.scan_dir(input_dir)]
+        if len(image_filenames) == 0:
+            print(f"Warning: No images found in {input_dir}")
+            continue
+
+        labels += [label] * len(image_filenames)
+        image_paths += [os.path.join(input_dir, f) for f in image_filenames]
+
+    # Assign the splits by source image, each image is its own source if the images are augmented on the fly
+    if os.path.normpath(input_base_dir) == os.path.normpath(Files.DATASET_AUGMENTED):
+        lineage = get_lineage()
+        groups = [get_group(image_path, lineage) for image_path in image_paths]
+    else:
+        groups = [os.path.basename(image_path) for image_path in image_paths]
+    splits = assign_splits(labels, groups, train_ratio, val_ratio, seed, stratify)
+
+    # Get the output directory of each image
+    rows = []
+    transfers = []
+    for label, input_image_path, split_index in zip(labels, image_paths, splits):
+        model_class = Files.MODEL_CLASSES[label]
+        split = SPLITS[split_index]
+
+        if mode == MANIFEST:
+            rows.append((input_image_path, model_class, split))
+            continue
+
+        output_dir = os.path.join(output_base_dirs[split], model_class)
+        transfers.append((input_image_path, output_dir))
+        rows.append((os.path.join(output_dir, os.path.basename(input_image_path)), model_class, split))
+
+    # Stream the images into the zip, with the same names as zip_to_train
+    if mode == ARCHIVE:
+        Files.ensure_directory_exists(Files.DATASET_ORGANIZED_ZIP)
+        members = [(input_image_path, os.path.relpath(output_image_path, Files.CWD))
+                   for (input_image_path, _), (output_image_path, _, _) in zip(transfers, rows)]
+        if Files.ZIP_PART_MAX_SIZE is not None:
+            Zip.write_parts(Files.DATASET_ORGANIZED_ZIP, members, Files.ZIP_PART_MAX_SIZE, workers=workers)
+        else:
+            with ZipFile(Files.DATASET_ORGANIZED_ZIP, 'w', ZIP_DEFLATED) as zipf:
+                Zip.write_members(zipf, members, workers)
+        print(f'Zipped the organized dataset into {Files.DATASET_ORGANIZED_ZIP}')
+
+    elif mode != MANIFEST:
+        # Remove the images of the previous runs that are not in the new split
+        removed = remove_stale_images(output_base_dirs, rows)
+        if removed:
+            print(f'Removed {removed} images of a previous split')
+
+        # Transfer the first file alone, so the others use the fallback mode if the requested one fails
+        if transfers:
+            mode = Files.transfer_file(*transfers[0], mode)
+            process_threads(lambda transfer: Files.transfer_file(*transfer, mode), transfers[1:], workers,
+                            label=f'Transferred ({mode})', unit='images')
+        check_organized_dataset(output_base_dirs)
+
+    # Record the split
+    write_split_manifest(rows)
+    print(f'Split {len(rows)} images from {len(set(zip(labels, groups)))} source images, '
+          f'the split manifest was saved to {Files.DATASET_SPLIT_MANIFEST}')
+
+    # Remove the input dataset
+    if remove_input and mode != MANIFEST:
+        rmtree(input_base_dir)
@@ -0,0 +1,76 @@
+def hamming_distance(a: int, b: int) -> int:
+    """
+    Get the number of different bits between two integers.
+
+    Args:
+        a (int): First integer.
+        b (int): Second integer.
+    Returns:
+        int: The Hamming distance.
+    """
+    return bin(a ^ b).count('1')
+
+
+class HammingIndex:
+    """
+    Multi-index hashing of fixed-size bit strings, for lookups within a Hamming distance.
+
+    The bits are split into max_distance + 1 chunks, and each chunk is indexed in its own table. Two keys within
+    max_distance differ in at most max_distance chunks, so they share at least one chunk exactly. A lookup only
+    compares the query against the keys that share a chunk with it, instead of every key.
+    """
+
+    def __init__(self, max_distance: int, bits: int = 64):
+        """
+        Initialize an empty index.
+
+        Args:
+            max_distance (int): Maximum Hamming distance of the lookups.
+            bits (int): Number of bits of the keys.
+        """
+        self.max_distance = max_distance
+        self.size = 0
+
+        # Split the bits into chunks of almost the same size
+        num_chunks = min(max_distance + 1, bits)
+        bounds = [bits * i // num_chunks for i in range(num_chunks + 1)]
+        self.chunks = [(start, (1 << (end - start)) - 1) for start, end in zip(bounds, bounds[1:])]
+        self.tables = [{} for _ in self.chunks]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, key: int, value: object) -> None:
+        """
+        Add a value to the index.
+
+        Args:
+            key (int): Key of the value.
+            value (object): The value.
+        """
+        item = (key, value)
+        for (shift, mask), table in zip(self.chunks, self.tables):
+            table.setdefault((key >> shift) & mask, []).append(item)
+        self.size += 1
+
+    def search(self, key: int) -> list[tuple[int, object]]:
+        """
+        Find the values whose key is within max_distance of a key.
+
+        Args:
+            key (int): The key to search.
+        Returns:
+            list[tuple[int, object]]: The distance and the value of each match, in no particular order.
+        """
+        matches = []
+        seen = set()
+        for (shift, mask), table in zip(self.chunks, self.tables):
+            for item in table.get((key >> shift) & mask, ()):
+                if id(item) in seen:
+                    continue
+                seen.add(id(item))
+
+                d = hamming_distance(key, item[0])
+                if d <= self.max_distance:
+                    matches.append((d, item[1]))
+        return matches
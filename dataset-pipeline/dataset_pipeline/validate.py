@@ -0,0 +1,212 @@
+import csv
+import os
+from time import time
+from PIL import Image
+
+from dataset_pipeline.config import Files
+from dataset_pipeline.files.manifest import Manifest
+from dataset_pipeline.parallel import get_workers, process_batches, process_threads
+
+# JPEG end of image marker, a truncated JPEG file does not end with it
+JPEG_EOI = b'\xff\xd9'
+
+# Number of bytes at the end of a JPEG file searched for the end of image marker, some cameras append data after it
+JPEG_TAIL_SIZE = 4096
+
+
+def validate_image(input_path, full_decode=None):
+    """
+    Validate an image from its header and structure, without decoding its pixels.
+
+    Args:
+        input_path (str): Path of the image.
+        full_decode (bool, optional): Also decode the image, this catches corrupted pixel data but is much slower.
+    Returns:
+        tuple[int, int]: The width and height of the image.
+    Raises:
+        ValueError: If the image is invalid, with the reason.
+    """
+    full_decode = Files.VALIDATION_FULL_DECODE if full_decode is None else full_decode
+
+    file_size = os.path.getsize(input_path)
+    if file_size == 0:
+        raise ValueError("Empty file")
+
+    # Read the header, and check the structure of the file (e.g. the chunk checksums of PNG images)
+    try:
+        with Image.open(input_path) as image:
+            width, height = image.size
+            image_format = image.format
+            image.verify()
+    except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+        raise ValueError(f"Invalid image ({e})")
+
+    if width == 0 or height == 0:
+        raise ValueError(f"Invalid size {width}x{height}")
+
+    # Check that JPEG images were not truncated
+    if image_format == 'JPEG':
+        with open(input_path, 'rb') as f:
+            f.seek(max(0, file_size - JPEG_TAIL_SIZE))
+            if JPEG_EOI not in f.read():
+                raise ValueError("Truncated JPEG, the end of image marker is missing")
+
+    if full_decode:
+        # Import OpenCV here, so the header validation does not load it
+        import cv2
+
+        image = cv2.imread(input_path, cv2.IMREAD_UNCHANGED)
+        if image is None:
+            raise ValueError("Could not decode the image")
+        if image.shape[:2] != (height, width):
+            raise ValueError(f"Decoded size {image.shape[1]}x{image.shape[0]} does not match the header")
+
+    return width, height
+
+
+def validate_images(tasks):
+    """
+    Validate a batch of images, this runs inside a worker process.
+
+    Args:
+        tasks (list[tuple[str, bool]]): List of (input path, full decode) tuples.
+    Returns:
+        tuple[list[dict], list[tuple[str, str]]]: The manifest entries of the valid images, with their width and
+            height, and the (input path, reason) tuples of the invalid images.
+    """
+    entries = []
+    invalid = []
+    for input_path, full_decode in tasks:
+        try:
+            width, height = validate_image(input_path, full_decode)
+        except ValueError as e:
+            invalid.append((input_path, str(e)))
+            continue
+
+        # Only record the size and mtime, so the pre-scan does not read the whole file to hash it
+        entry = Manifest.create_entry(input_path, [], hash_content=False)
+        entry['width'] = width
+        entry['height'] = height
+        entries.append(entry)
+    return entries, invalid
+
+
+def get_image_sizes(manifest_path=None):
+    """
+    Get the sizes of the images recorded by the validation stage, so they are not read again from the headers.
+
+    Args:
+        manifest_path (str, optional): Path of the validation manifest.
+    Returns:
+        dict[str, tuple[int, int]]: The width and height of each image, only for the images that did not change
+            since they were validated.
+    """
+    manifest_path = Files.DATASET_VALIDATED_MANIFEST if manifest_path is None else manifest_path
+
+    _, entries = Manifest.read(manifest_path)
+
+    sizes = {}
+    for input_path, entry in entries.items():
+        try:
+            stat = os.stat(input_path)
+        except FileNotFoundError:
+            continue
+        if stat.st_size == entry['size'] and stat.st_mtime_ns == entry['mtime']:
+            sizes[input_path] = (entry['width'], entry['height'])
+    return sizes
+
+
+def quarantine_images(invalid, report_path=None):
+    """
+    Move the invalid images to the quarantine, and append them to the quarantine report.
+
+    Args:
+        invalid (list[tuple[str, str]]): List of (image path, reason) tuples.
+        report_path (str, optional): Path of the report, the paths are stored relative to the report directory.
+    """
+    report_path = Files.DATASET_QUARANTINE_REPORT if report_path is None else report_path
+
+    def move_image(image_path):
+        output_dir = os.path.join(Files.DATASET_QUARANTINE, os.path.basename(os.path.dirname(image_path)))
+        os.makedirs(output_dir, exist_ok=True)
+        Files.transfer_file(image_path, output_dir, Files.MOVE)
+
+    process_threads(move_image, [image_path for image_path, _ in invalid], Files.IO_WORKERS, label='Quarantined',
+                    unit='images')
+
+    # Record the reason of each image
+    report_dir = os.path.dirname(report_path)
+    Files.ensure_directory_exists(report_dir)
+    write_header = not os.path.exists(report_path)
+    with open(report_path, 'a', newline='') as f:
+        writer = csv.writer(f)
+        if write_header:
+            writer.writerow(('path', 'reason'))
+        for image_path, reason in invalid:
+            writer.writerow((os.path.relpath(image_path, report_dir).replace(os.sep, '/'), reason))
+
+
+def validate_dataset(full_decode=None, workers=None, batch_size=None,
+                     incremental=True):
+    """
+    Validate the original dataset before the other stages, quarantining the images that cannot be read.
+
+    The width and height of the valid images are recorded in the validation manifest.
+
+    Args:
+        full_decode (bool, optional): Also decode the images, this catches corrupted pixel data but is much slower.
+        workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+        batch_size (int, optional): Number of images per worker batch.
+        incremental (bool): Skip the images that were already validated with the same parameters.
+    """
+    full_decode = Files.VALIDATION_FULL_DECODE if full_decode is None else full_decode
+    workers = Files.NUM_WORKERS if workers is None else workers
+    batch_size = Files.BATCH_SIZE if batch_size is None else batch_size
+
+    # Get current time
+    start_time = time()
+
+    # Load the manifest of the previous runs
+    manifest = Manifest(Files.DATASET_VALIDATED_MANIFEST, {'full_decode': full_decode})
+
+    tasks = []
+    sources = []
+    for _, model_class in enumerate(Files.MODEL_CLASSES):
+        # Ensure the input directory exists
+        input_dir = os.path.join(Files.DATASET_ORIGINAL, model_class)
+        os.makedirs(input_dir, exist_ok=True)
+
+        # Queue each image that was not validated yet
+        for entry in Files.scan_images(input_dir):
+            sources.append(entry.path)
+            if not incremental or not manifest.is_processed(entry.path):
+                tasks.append((entry.path, full_decode))
+
+    if len(tasks) < len(sources):
+        print(f"Skipping {len(sources) - len(tasks)} images already validated")
+
+    # Validate the images across the worker processes
+    workers = get_workers(workers)
+    validated = 0
+    invalid = []
+    for entries, batch_invalid in process_batches(validate_images, tasks, workers, batch_size):
+        manifest.add(entries)
+        invalid += batch_invalid
+        validated += len(entries) + len(batch_invalid)
+        print(f"Validated {validated}/{len(tasks)} images")
+
+    # Quarantine the invalid images
+    for image_path, reason in invalid:
+        print(f"Warning: {image_path} is invalid: {reason}")
+    if invalid:
+        quarantine_images(invalid)
+
+    # Remove the entries of the images that no longer exist
+    invalid_paths = {image_path for image_path, _ in invalid}
+    manifest.save([s for s in sources if s not in invalid_paths])
+
+    # Log the throughput
+    elapsed_time = time() - start_time
+    throughput = validated / elapsed_time if elapsed_time > 0 else 0
+    print(f"Validated {validated} images with {workers} workers in {elapsed_time:.2f} seconds "
+          f"({throughput:.2f} images/s), {len(invalid)} images were quarantined to {Files.DATASET_QUARANTINE}")
@@ -0,0 +1,101 @@
+import numpy as np
+from PIL import Image
+from ultralytics.data.dataset import ClassificationDataset
+from ultralytics.models.yolo.classify import ClassificationTrainer
+from ultralytics.utils import DEFAULT_CFG
+
+from dataset_pipeline.config import Files
+from dataset_pipeline.loader import OnlineAugmenter
+
+
+class OnlineTransforms:
+    """
+    Transforms of the training images that apply the augmentation pipeline on the fly before the YOLO transforms.
+    """
+
+    def __init__(self, augmenter, transforms):
+        """
+        Initialize the transforms.
+
+        Args:
+            augmenter (OnlineAugmenter): The augmenter of the images.
+            transforms (Callable): The YOLO transforms, applied to the augmented image.
+        """
+        self.augmenter = augmenter
+        self.transforms = transforms
+        self.index = 0
+
+    def __call__(self, image):
+        """
+        Augment an image and apply the YOLO transforms.
+
+        Args:
+            image (PIL.Image.Image): The RGB image of the sample at self.index.
+        Returns:
+            torch.Tensor: The transformed image.
+        """
+        image = self.augmenter(np.asarray(image), self.index, rgb=True)
+        return self.transforms(Image.fromarray(image))
+
+
+class OnlineAugmentationDataset(ClassificationDataset):
+    """
+    YOLO classification dataset that augments the training images on the fly.
+    """
+
+    def __init__(self, root, args, augment=False, prefix='', augmenter=None):
+        """
+        Initialize the dataset.
+
+        Args:
+            root (str): Folder of the split, with a subfolder per class.
+            args (Namespace): The training arguments.
+            augment (bool): Augment the images, only for the training split.
+            prefix (str): Prefix of the log messages.
+            augmenter (OnlineAugmenter, optional): The augmenter of the images.
+        """
+        super().__init__(root, args, augment, prefix)
+        if augment and augmenter is not None:
+            self.torch_transforms = OnlineTransforms(augmenter, self.torch_transforms)
+
+    def __getitem__(self, i):
+        # The augmentations of each sample are seeded by its index
+        if isinstance(self.torch_transforms, OnlineTransforms):
+            self.torch_transforms.index = i
+        return super().__getitem__(i)
+
+
+class OnlineAugmentationTrainer(ClassificationTrainer):
+    """
+    YOLO classification trainer that augments the training images on the fly, with seeded per-epoch randomness.
+
+    Pass it to the model with model.train(trainer=OnlineAugmentationTrainer, ...). The batches loaded ahead by the
+    workers before an epoch starts use the augmentations of the previous epoch.
+    """
+
+    def __init__(self, cfg=DEFAULT_CFG, overrides=None, _callbacks=None):
+        """
+        Initialize the trainer, the augmentations are seeded by Files.AUGMENTATION_SEED.
+
+        Args:
+            cfg (dict | str): The training configuration.
+            overrides (dict, optional): The training arguments.
+            _callbacks (dict, optional): The callbacks of the trainer.
+        """
+        super().__init__(cfg, overrides, _callbacks)
+        self.augmenter = OnlineAugmenter(Files.AUGMENTATION_SEED)
+        self.add_callback('on_train_epoch_start', lambda trainer: trainer.augmenter.set_epoch(trainer.epoch))
+
+    def build_dataset(self, img_path, mode='train', batch=None):
+        """
+        Build the dataset of a split, only the training images are augmented.
+
+        Args:
+            img_path (str): Folder of the split.
+            mode (str): The split, train, val or test.
+            batch (int, optional): The batch size, unused.
+        Returns:
+            OnlineAugmentationDataset: The dataset.
+        """
+        return OnlineAugmentationDataset(img_path, self.args, augment=mode == 'train', prefix=mode,
+                                         augmenter=self.augmenter)
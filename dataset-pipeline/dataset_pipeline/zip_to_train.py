@@ -0,0 +1,44 @@
+import os
+from shutil import rmtree
+import zipfile
+
+from typing_extensions import LiteralString
+
+from dataset_pipeline.files.zip import Zip
+from dataset_pipeline.config import Files
+
+def zip_to_train(input_dir: LiteralString, input_yolo_dataset_organized_dir: LiteralString,
+                 output_zip_dir: LiteralString, remove_input: bool = True) -> None:
+    """
+    Define the function to zip the required files for model training.
+
+    Args:
+        input_dir (str): The base input directory where the YOLO files are located.
+        input_yolo_dataset_organized_dir (str): The directory containing the organized dataset files.
+        output_zip_dir (str): The directory where the output zip file will be saved.
+        remove_input (bool): Remove the organized dataset folder after zipping it.
+
+    Returns:
+        None
+    """
+    # Define the output zip filename
+    output_zip_filename = os.path.basename(Files.DATASET_ORGANIZED_ZIP)
+    output_zip_path = os.path.join(output_zip_dir, output_zip_filename)
+
+    # Check if the folder exists, if not create it
+    Files.ensure_directory_exists(output_zip_dir)
+
+    if Files.ZIP_PART_MAX_SIZE is not None:
+        # Zip the YOLO dataset organized files into size-capped parts
+        members = Zip.get_nested_members(input_dir, input_yolo_dataset_organized_dir)
+        Zip.write_parts(output_zip_path, members, Files.ZIP_PART_MAX_SIZE, workers=Files.IO_WORKERS)
+        print('Zip the YOLO dataset organized files')
+    else:
+        with (zipfile.ZipFile(output_zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf):
+            # Zip the YOLO dataset organized files
+            Zip.zip_nested_folder(zipf, input_dir, input_yolo_dataset_organized_dir, workers=Files.IO_WORKERS)
+            print('Zip the YOLO dataset organized files')
+
+    # Remove the original dataset organized folder
+    if remove_input:
+        rmtree(input_yolo_dataset_organized_dir)
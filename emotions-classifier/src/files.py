@@ -1,22 +1,16 @@
 import os
 
-from lib.files import Files as F
+from dataset_pipeline import Config
 
-class Files(F):
+class Files(Config):
     """
-    Files utility class.
+    Files utility class, with the configuration of the dataset pipeline.
     """
     # Current working directory
     CWD = os.path.dirname(os.path.abspath(__file__))
 
-    # Dataset paths
+    # Dataset path, the other dataset paths are derived from it
     DATASET = os.path.join(CWD, '../dataset')
-    DATASET_ORIGINAL = os.path.join(DATASET, 'original')
-    DATASET_AUGMENTED = os.path.join(DATASET, 'augmented')
-    DATASET_ORGANIZED = os.path.join(DATASET, 'organized')
-    DATASET_ORGANIZED_TRAINING = os.path.join(DATASET_ORGANIZED, 'train')
-    DATASET_ORGANIZED_VALIDATIONS = os.path.join(DATASET_ORGANIZED, 'val')
-    DATASET_ORGANIZED_TESTING = os.path.join(DATASET_ORGANIZED, 'test')
 
     # Model paths
     RUNS = os.path.join(CWD, '../runs')
@@ -34,6 +28,3 @@ class Files(F):
 
     # Augmentations
     NUM_AUGMENTATIONS = 3
-
-    # Allowed image extensions
-    IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
\ No newline at end of file
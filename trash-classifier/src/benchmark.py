@@ -0,0 +1,315 @@
+import io
+import os
+import re
+import tracemalloc
+from tempfile import TemporaryDirectory
+from time import perf_counter
+import cv2
+import numpy as np
+
+from dataset_pipeline import augment, configure
+from dataset_pipeline.augment import OUTPUT_FORMATS, create_transform, encode_image, get_transform
+from dataset_pipeline.dedup import find_duplicates
+from dataset_pipeline.files.zip import Zip
+from dataset_pipeline.resize import get_imread_flag, resize
+from dataset_pipeline.utils import match_any
+from dataset_pipeline.utils.hamming import hamming_distance
+from files import Files
+
+# Use the paths and settings of the project, at the module level so the worker processes also use them
+configure(Files)
+
+
+def synthetic_images(num_images, shapes=((Files.IMAGE_SIZE, Files.IMAGE_SIZE),), seed=0):
+    """
+    Generate a synthetic dataset of random images.
+
+    Args:
+        num_images (int): Number of images to generate.
+        shapes (tuple[tuple[int, int]]): Image shapes (height, width), assigned in round-robin.
+        seed (int): Seed of the random generator.
+    Returns:
+        list[np.ndarray]: The generated BGR uint8 images.
+    """
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 256, (*shapes[i % len(shapes)], 3), dtype=np.uint8) for i in range(num_images)]
+
+
+def measure(func, images):
+    """
+    Measure the per-image latency and peak allocations of a function.
+
+    The latency and the allocations are measured in separate runs, since tracing the allocations slows
+    down the function.
+
+    Args:
+        func (Callable[[np.ndarray], object]): Function applied to each image.
+        images (list[np.ndarray]): Images to process.
+    Returns:
+        tuple[float, float]: The mean latency in milliseconds and the mean peak allocations in KiB per image.
+    """
+    # Measure the latency
+    start_time = perf_counter()
+    for image in images:
+        func(image)
+    latency = (perf_counter() - start_time) / len(images) * 1000
+
+    # Measure the peak allocations of each image
+    peak = 0
+    tracemalloc.start()
+    for image in images:
+        tracemalloc.reset_peak()
+        func(image)
+        peak += tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return latency, peak / len(images) / 1024
+
+
+def benchmark_color_conversions(num_images=200, input_size=(480, 640)):
+    """
+    Benchmark the resize and augment steps converting the images from BGR to RGB and back, against
+    keeping them in OpenCV's native BGR order.
+
+    Args:
+        num_images (int): Number of synthetic images.
+        input_size (tuple[int, int]): Shape (height, width) of the images before resizing.
+    """
+    originals = synthetic_images(num_images, (input_size,))
+    resized = [resize(image) for image in originals]
+    transform = get_transform(Files.IMAGE_SIZE, Files.IMAGE_SIZE)
+
+    def resize_rgb(image):
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        return cv2.cvtColor(resize(image), cv2.COLOR_RGB2BGR)
+
+    def augment_rgb(image):
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        return cv2.cvtColor(transform(image=image)['image'], cv2.COLOR_RGB2BGR)
+
+    def augment_bgr(image):
+        return transform(image=image)['image']
+
+    print(f"Color conversions ({num_images} images)")
+    for name, func, images in (('resize RGB', resize_rgb, originals), ('resize BGR', resize, originals),
+                               ('augment RGB', augment_rgb, resized), ('augment BGR', augment_bgr, resized)):
+        latency, peak = measure(func, images)
+        print(f"  {name:<16} {latency:8.3f} ms/image {peak:10.1f} KiB/image peak")
+
+
+def benchmark_reduced_decode(num_images=20, input_size=(3024, 4032), min_ratios=(1.0, 2.0)):
+    """
+    Benchmark decoding large JPEG images at full resolution before resizing them, against decoding them at
+    a reduced scale, and compare the quality of the resized images.
+
+    Args:
+        num_images (int): Number of synthetic images.
+        input_size (tuple[int, int]): Shape (height, width) of the JPEG images.
+        min_ratios (tuple[float]): Minimum ratios between the reduced decoding size and the image size.
+    """
+    with TemporaryDirectory() as tmp_dir:
+        # Save smooth synthetic images, so they compress like photos
+        input_paths = []
+        for i, image in enumerate(synthetic_images(num_images, ((input_size[0] // 32, input_size[1] // 32),))):
+            input_path = os.path.join(tmp_dir, f'{i}.jpg')
+            cv2.imwrite(input_path, cv2.resize(image, (input_size[1], input_size[0]), interpolation=cv2.INTER_CUBIC))
+            input_paths.append(input_path)
+
+        # Resize the images decoded at full resolution as the reference
+        references = [resize(cv2.imread(input_path)) for input_path in input_paths]
+
+        print(f"Reduced JPEG decoding ({num_images} images of {input_size[1]}x{input_size[0]})")
+        for min_ratio in (None, *min_ratios):
+            def read_resize(input_path):
+                return resize(cv2.imread(input_path, get_imread_flag(input_path, min_ratio)))
+
+            latency, peak = measure(read_resize, input_paths)
+            psnr = np.mean([cv2.PSNR(read_resize(p), r) for p, r in zip(input_paths, references)])
+            name = 'full' if min_ratio is None else f'min ratio {min_ratio}'
+            print(f"  {name:<16} {latency:8.3f} ms/image {peak:10.1f} KiB/image peak {psnr:8.2f} dB PSNR")
+
+
+def benchmark_output_formats(num_images=200):
+    """
+    Benchmark the size, encoding time and decoding time of the augmented images in each output format.
+
+    Args:
+        num_images (int): Number of synthetic images.
+    """
+    # Use smooth synthetic images, so they compress like photos
+    images = [resize(image) for image in synthetic_images(num_images, ((Files.IMAGE_SIZE // 16,) * 2,))]
+
+    print(f"Output formats ({num_images} images of {Files.IMAGE_SIZE}x{Files.IMAGE_SIZE})")
+    for output_format in OUTPUT_FORMATS:
+        start_time = perf_counter()
+        encoded = [encode_image(image, output_format) for image in images]
+        encode_time = (perf_counter() - start_time) / num_images * 1000
+
+        # Measure the decoding time, which is paid by the training on every epoch
+        start_time = perf_counter()
+        for data in encoded:
+            if output_format == 'npy':
+                np.load(io.BytesIO(data))
+            else:
+                cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        decode_time = (perf_counter() - start_time) / num_images * 1000
+
+        size = sum(len(data) for data in encoded) / num_images / 1024
+        print(f"  {output_format:<16} {size:8.2f} KB/image {encode_time:8.3f} ms/image encode "
+              f"{decode_time:8.3f} ms/image decode")
+
+
+def benchmark_augment_pipeline(num_images=200, num_augmentations=Files.NUM_AUGMENTATIONS):
+    """
+    Benchmark the per-image overhead of building the augmentation pipeline for every image against
+    reusing the pipeline cached by image shape.
+
+    Args:
+        num_images (int): Number of synthetic images.
+        num_augmentations (int): Number of augmentations applied to each image.
+    """
+    images = synthetic_images(num_images)
+    print(f"Augmentation pipeline ({num_images} images, {num_augmentations} augmentations per image)")
+    for name, factory in (('per image', create_transform), ('cached by shape', get_transform)):
+        augment.transform_cache = None
+        build_time = 0.0
+        start_time = perf_counter()
+        for image in images:
+            build_start_time = perf_counter()
+            transform = factory(image.shape[0], image.shape[1])
+            build_time += perf_counter() - build_start_time
+
+            for _ in range(num_augmentations):
+                transform(image=image)
+        elapsed_time = perf_counter() - start_time
+
+        print(f"  {name:<16} {elapsed_time / num_images * 1000:8.3f} ms/image "
+              f"(pipeline build {build_time / num_images * 1000:.3f} ms/image)")
+
+
+def benchmark_ignore_matcher(num_packages=300, files_per_package=40, num_project_files=200):
+    """
+    Benchmark listing the files to zip in a project with a large virtualenv, filtering the ignored paths of
+    every file during the walk against pruning the ignored directories with the compiled ignore matcher.
+
+    Args:
+        num_packages (int): Number of packages installed in the virtualenv.
+        files_per_package (int): Number of files of each package.
+        num_project_files (int): Number of files of the project.
+    """
+    with TemporaryDirectory() as tmp_dir:
+        # Create the project and its virtualenv
+        for i in range(num_project_files):
+            project_dir = os.path.join(tmp_dir, 'src', f'module{i % 10}')
+            os.makedirs(project_dir, exist_ok=True)
+            open(os.path.join(project_dir, f'file{i}.py'), 'w').close()
+        for i in range(num_packages):
+            package_dir = os.path.join(tmp_dir, '.venv', 'lib', 'site-packages', f'package{i}', '__pycache__')
+            os.makedirs(package_dir, exist_ok=True)
+            for j in range(files_per_package):
+                open(os.path.join(os.path.dirname(package_dir), f'file{j}.py'), 'w').close()
+                open(os.path.join(package_dir, f'file{j}.pyc'), 'w').close()
+        ignore_filenames_regex = [re.compile(r'.*\.pyc$'), re.compile(r'\.DS_Store$')]
+
+        def filter_files():
+            # Check the ignored directories and filenames of every file, walking the whole tree
+            members = []
+            for root, _, filenames in os.walk(tmp_dir):
+                filenames = [f for f in filenames if
+                             not any(os.path.relpath(root, tmp_dir).startswith(d) for d in Files.IGNORE_DIRS)]
+                members += [(os.path.join(root, f), os.path.relpath(os.path.join(root, f), tmp_dir))
+                            for f in filenames if not match_any(ignore_filenames_regex, f)]
+            return members
+
+        def prune_dirs():
+            return Zip.get_nested_members(tmp_dir, tmp_dir, ignore_filenames_regex=ignore_filenames_regex)
+
+        num_files = num_project_files + num_packages * files_per_package * 2
+        print(f"Ignore matcher ({num_files} files, {num_files - num_project_files} in the virtualenv)")
+        for name, func in (('filter files', filter_files), ('prune dirs', prune_dirs)):
+            start_time = perf_counter()
+            members = func()
+            elapsed_time = perf_counter() - start_time
+            print(f"  {name:<16} {elapsed_time * 1000:8.2f} ms {len(members):8d} files")
+
+
+def benchmark_scan_dir(num_files=100_000):
+    """
+    Benchmark listing the images of a large folder and checking that their outputs exist, one system call per
+    file against a single os.scandir listing.
+
+    Args:
+        num_files (int): Number of files in the folder.
+    """
+    with TemporaryDirectory() as tmp_dir:
+        for i in range(num_files):
+            open(os.path.join(tmp_dir, f'{i}.jpg'), 'w').close()
+
+        def listdir():
+            # Check the type of each entry, then check each output
+            image_filenames = [f for f in os.listdir(tmp_dir) if not os.path.isdir(os.path.join(tmp_dir, f)) and
+                               f.lower().endswith(Files.IMAGE_EXTENSIONS)]
+            return [f for f in image_filenames if os.path.exists(os.path.join(tmp_dir, f))]
+
+        def scandir():
+            image_filenames = [entry.name for entry in Files.scan_images(tmp_dir)]
+            output_paths = {entry.path for entry in Files.scan_dir(tmp_dir)}
+            return [f for f in image_filenames if os.path.join(tmp_dir, f) in output_paths]
+
+        print(f"Folder listing ({num_files} files)")
+        for name, func in (('listdir', listdir), ('scandir', scandir)):
+            start_time = perf_counter()
+            image_filenames = func()
+            elapsed_time = perf_counter() - start_time
+            print(f"  {name:<16} {elapsed_time * 1000:8.2f} ms {len(image_filenames):8d} files")
+
+
+def benchmark_duplicate_search(num_images=5_000, max_distance=Files.DEDUP_MAX_DISTANCE):
+    """
+    Benchmark finding the near-duplicate hashes by comparing each hash with every kept hash, against looking
+    them up in a multi-index hash table.
+
+    Args:
+        num_images (int): Number of random 64-bit hashes.
+        max_distance (int): Maximum Hamming distance between the hashes of two duplicates.
+    """
+    rng = np.random.default_rng(0)
+    hashes = rng.integers(0, 2 ** 63, num_images, dtype=np.int64).tolist()
+    paths = [str(i) for i in range(num_images)]
+
+    def compare_all():
+        kept = []
+        duplicates = []
+        for path, image_hash in zip(paths, hashes):
+            matches = [(hamming_distance(image_hash, h), p) for h, p in kept]
+            match = min((m for m in matches if m[0] <= max_distance), default=None)
+            if match is None:
+                kept.append((image_hash, path))
+            else:
+                duplicates.append((path, match[1], match[0]))
+        return duplicates
+
+    print(f"Duplicate search ({num_images} hashes, max distance {max_distance})")
+    for name, func in (('compare all', compare_all),
+                       ('multi-index', lambda: find_duplicates(paths, hashes, max_distance))):
+        start_time = perf_counter()
+        duplicates = func()
+        elapsed_time = perf_counter() - start_time
+        print(f"  {name:<16} {elapsed_time * 1000:8.2f} ms {len(duplicates):8d} duplicates")
+
+
+def main():
+    """
+    Main function to run the script.
+    """
+    # Run the benchmarks
+    benchmark_augment_pipeline()
+    benchmark_color_conversions()
+    benchmark_reduced_decode()
+    benchmark_output_formats()
+    benchmark_ignore_matcher()
+    benchmark_scan_dir()
+    benchmark_duplicate_search()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,17 @@
+from dataset_pipeline import configure
+from dataset_pipeline.shard import shard_dataset
+from files import Files
+
+# Use the paths and settings of the project, at the module level so the worker processes also use them
+configure(Files)
+
+
+def main():
+    """
+    Main function to run the script.
+    """
+    # Pack the augmented dataset into shards
+    shard_dataset()
+
+if __name__ == '__main__':
+    main()